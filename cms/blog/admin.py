@@ -1,15 +1,16 @@
-from blog.models import Posts, Category, UserProfile, Comments, PollQuestion, PollOption, PollAnswer, ContactSubmission, Notification, TermsOfService, Event, PostImage, BellSongSuggestion, PrivacyPolicy, MemeOfWeek, Cookie, SiteSettings, PostDocument, Changelog
+from blog.models import Posts, Category, UserProfile, Comments, PollQuestion, PollOption, PollAnswer, ContactSubmission, Notification, TermsOfService, Event, PostImage, BellSongSuggestion, PrivacyPolicy, MemeOfWeek, Cookie, SiteSettings, PostDocument, Changelog, MediaJob
 from django.contrib import admin
 from django.utils.safestring import mark_safe
 from django.db import models
 from django import forms
 from django.http import HttpResponseRedirect
 from django.urls import reverse
-import markdown
 import re # Import regex module
 from unfold_markdown.widgets import MarkdownWidget
 from unfold.widgets import UnfoldBooleanSwitchWidget
 from .forms import MemeSelectionForm, PostAdminForm
+from .jobs import enqueue
+from .search import search_posts
 
 @admin.register(Posts)
 class PostsAdmin(admin.ModelAdmin):
@@ -20,6 +21,13 @@ class PostsAdmin(admin.ModelAdmin):
     search_fields = ('title', 'content')
     exclude = ('author',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Търсенето използва индекса от search.py вместо LIKE '%...%' по цялото съдържание
+        if not search_term:
+            return queryset, False
+        matches = search_posts(Posts.objects.all(), search_term).values('pk')
+        return queryset.filter(pk__in=matches), False
+
     # V V V ДОБАВЯНЕ НА MARKDOWN ВИДЖЕТ V V V
     def formfield_for_dbfield(self, db_field, request, **kwargs):
         if db_field.name == "content":
@@ -32,17 +40,33 @@ class PostsAdmin(admin.ModelAdmin):
         base_fields = list(self.readonly_fields_base)
         if not user.has_perm('blog.can_allow_posts'):
             base_fields.append('allowed')
+        if obj is not None:
+            base_fields.append('media_status')
         return tuple(base_fields)
 
+    def media_status(self, obj):
+        counts = dict(
+            obj.media_jobs.exclude(status=MediaJob.STATUS_DONE).values_list('status').annotate(count=models.Count('id'))
+        )
+        if not counts:
+            return "Всички файлове са обработени"
+        labels = dict(MediaJob.STATUS_CHOICES)
+        return ", ".join(f"{labels[status]}: {count}" for status, count in counts.items())
+    media_status.short_description = "Обработка на файловете"
+
     def save_model(self, request, obj, form, change):
         if not obj.pk:
             obj.author = request.user
         super().save_model(request, obj, form, change)
 
         # Handle multiple image uploads
+        # Файловете само се записват; смаляването, EXIF и производните размери се правят от run_media_jobs
         images = request.FILES.getlist('gallery_images')
         for image in images:
-            PostImage.objects.create(post=obj, image=image)
+            post_image = PostImage(post=obj, image=image)
+            post_image.defer_renditions = True
+            post_image.save()
+            enqueue('process_post_image', post_image.pk, post=obj)
 
         # Handle image deletion
         if 'delete_images' in form.cleaned_data:
@@ -52,7 +76,11 @@ class PostsAdmin(admin.ModelAdmin):
         # Handle multiple document uploads
         documents = request.FILES.getlist('gallery_documents')
         for document in documents:
-            PostDocument.objects.create(post=obj, file=document)
+            post_document = PostDocument.objects.create(post=obj, file=document)
+            enqueue('process_post_document', post_document.pk, post=obj)
+
+        if images or documents:
+            self.message_user(request, f'{len(images) + len(documents)} файл(а) ще бъдат обработени на заден план.')
 
         # Handle document deletion
         if 'delete_documents' in form.cleaned_data:
@@ -241,8 +269,8 @@ class TermsOfServiceAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
     def content_preview(self, obj):
-        if obj.content:
-            html = markdown.markdown(obj.content)
+        if obj.content_html:
+            html = obj.content_html
             return mark_safe(html[:150] + "..." if len(html) > 150 else html)
         return "-"
     content_preview.short_description = 'Преглед'
@@ -264,8 +292,8 @@ class PrivacyPolicyAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
     def content_preview(self, obj):
-        if obj.content:
-            html = markdown.markdown(obj.content)
+        if obj.content_html:
+            html = obj.content_html
             return mark_safe(html[:150] + "..." if len(html) > 150 else html)
         return "-"
     content_preview.short_description = 'Преглед'
@@ -316,6 +344,8 @@ class PostDocumentAdmin(admin.ModelAdmin):
     readonly_fields = ('post', 'file')
 
     def get_file_name(self, obj):
+        if obj.file_name:
+            return obj.file_name
         if obj.file:
             return obj.file.name.split('/')[-1]
         return "N/A"
@@ -325,6 +355,23 @@ class PostDocumentAdmin(admin.ModelAdmin):
         # Documents are added via the Post admin, not directly
         return False
 
+@admin.register(MediaJob)
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'object_id', 'post', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('post__title',)
+    readonly_fields = ('task', 'object_id', 'post', 'status', 'attempts', 'error', 'created_at', 'started_at', 'finished_at')
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=MediaJob.STATUS_DONE).update(status=MediaJob.STATUS_PENDING, error='')
+        self.message_user(request, f'{updated} задача(и) са върнати в опашката.')
+    retry_jobs.short_description = "Изпълни отново"
+
+    def has_add_permission(self, request):
+        # Задачите се създават при качване на файлове към публикация
+        return False
+
 @admin.register(MemeOfWeek)
 class MemeOfWeekAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'image_preview', 'is_approved', 'votes', 'created_at')
@@ -418,7 +465,7 @@ class SiteSettingsAdmin(admin.ModelAdmin):
         from django.http import HttpResponseRedirect
         from django.urls import reverse
 
-        obj, created = SiteSettings.objects.get_or_create(pk=1)
+        obj = SiteSettings.load()
         return HttpResponseRedirect(reverse('admin:blog_sitesettings_change', args=(obj.pk,)))
 
     def has_add_permission(self, request):
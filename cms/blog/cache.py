@@ -0,0 +1,106 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _version_key(model):
+    return f'blog:api-cache:version:{model._meta.label_lower}'
+
+
+def get_model_versions(*models):
+    """
+    Returns the current cache version for each model.
+    A missing version (first use or evicted key) gets a fresh random value, so stale entries are never reused.
+    """
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_model_version(model):
+    """
+    Invalidates every cached response that depends on the given model.
+    """
+    cache.set(_version_key(model), uuid.uuid4().hex, None)
+
+
+def cache_anonymous_response(*models):
+    """
+    Caches the serialized data of a successful GET response for anonymous users.
+    The key is built from the full path (including the query string) and the versions of the given models,
+    so a post_save/post_delete on any of them invalidates the entry (see signals.py).
+
+    Meant to be used with method_decorator on DRF handlers (list, retrieve, get).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+
+            versions = ':'.join(get_model_versions(*models))
+            path_hash = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+            cache_key = f'blog:api-cache:response:{path_hash}:{versions}'
+
+            data = cache.get(cache_key)
+            if data is not None:
+                return Response(data)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(cache_key, response.data, settings.API_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def etag_on_model_versions(*models):
+    """
+    Answers If-None-Match with 304 Not Modified before the view runs.
+    The ETag is derived from the full path and the versions of the given models, so it changes
+    exactly when the cached response would be invalidated.
+
+    Meant to be used with method_decorator on DRF handlers, above cache_anonymous_response.
+    """
+    def etag_func(request, *args, **kwargs):
+        versions = ':'.join(get_model_versions(*models))
+        return hashlib.md5(f'{request.get_full_path()}:{versions}'.encode('utf-8')).hexdigest()
+    return condition(etag_func=etag_func)
+
+
+def idempotent_response(view_func):
+    """
+    Makes a POST handler safe to retry: a successful response is stored under the client's
+    Idempotency-Key header (per user and path) and replayed for repeated requests with the same key.
+
+    Meant to be used with method_decorator on DRF handlers.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key or not request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        key_hash = hashlib.md5(f'{request.path}:{key}'.encode('utf-8')).hexdigest()
+        cache_key = f'blog:idempotency:{request.user.pk}:{key_hash}'
+
+        stored = cache.get(cache_key)
+        if stored is not None:
+            data, status_code = stored
+            return Response(data, status=status_code)
+
+        response = view_func(request, *args, **kwargs)
+        if status.is_success(response.status_code):
+            cache.set(cache_key, (response.data, response.status_code), settings.IDEMPOTENCY_KEY_TIMEOUT)
+        return response
+    return wrapper
@@ -0,0 +1,145 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    Read-only view of `length` bytes of an open file starting at `start`.
+    fileno() is kept, so WSGI servers with wsgi.file_wrapper can still send the range with sendfile().
+    """
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) of a single `bytes=` range, None for a missing or unsupported header
+    (several ranges are served as the whole file) and False for an unsatisfiable one.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: последните N байта
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    return f"{disposition}; filename*=UTF-8''{quote(filename)}"
+
+
+def media_response(request, field_file, filename, as_attachment=False, checksum=''):
+    """
+    Serves a stored file with conditional request (ETag/Last-Modified) and single Range support.
+
+    With MEDIA_OFFLOAD = 'nginx' or 'apache' the transfer is handed to the web server through
+    X-Accel-Redirect / X-Sendfile; otherwise a FileResponse is returned, which the WSGI server sends with sendfile().
+    Storages without local paths are redirected to the file URL.
+    """
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        return HttpResponseRedirect(field_file.url)
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        # Записът съществува, но файлът липсва в хранилището
+        raise Http404("Файлът не е намерен.")
+    etag = f'"{checksum}"' if checksum else f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if settings.MEDIA_OFFLOAD:
+            response = offload_response(path, field_file.name)
+        else:
+            response = file_response(request, path, stat.st_size, etag, last_modified)
+        if response.status_code != 416:
+            response['Content-Type'] = content_type
+            response['Content-Disposition'] = content_disposition(filename, as_attachment)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def offload_response(path, name):
+    # Уеб сървърът сам обработва Range заглавките на вътрешното пренасочване
+    response = HttpResponse()
+    if settings.MEDIA_OFFLOAD == 'nginx':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def file_response(request, path, size, etag, last_modified):
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range:
+        # If-Range: частичен отговор само ако файлът не е променян
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            if etag not in parse_etags(if_range):
+                byte_range = None
+        elif if_range != http_date(last_modified):
+            byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        raise Http404("Файлът не е намерен.")
+    if byte_range is None:
+        return FileResponse(file)
+
+    start, end = byte_range
+    response = FileResponse(FileRange(file, start, end - start + 1), status=206)
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -0,0 +1,90 @@
+import io
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Формати на производните изображения: WebP за съвременните браузъри и JPEG като резервен вариант
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def rendition_name(source_name, width, extension):
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'renditions', f'{stem}-{width}w.{extension}')
+
+
+def _encode(image, image_format, options):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG няма прозрачност, затова я заменяме с бял фон
+        background = Image.new('RGB', image.size, 'white')
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_renditions(field_file):
+    """
+    Writes width-bounded WebP and JPEG copies of an uploaded image next to it (in a `renditions` directory)
+    and returns their description:
+    {'source': <original name>, 'width': <original width>, 'webp': {'480': <name>, ...}, 'jpeg': {...}}.
+
+    Images are never upscaled; an image narrower than the smallest width gets a single re-encoded copy.
+    Animated and unreadable files get no renditions and are served as uploaded.
+    """
+    renditions = {'source': field_file.name}
+    try:
+        with field_file.open('rb'):
+            image = Image.open(field_file)
+            if getattr(image, 'is_animated', False):
+                return renditions
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as error:
+        logger.warning("Cannot generate renditions for %s: %s", field_file.name, error)
+        return renditions
+
+    renditions['width'] = image.width
+    widths = sorted({min(width, image.width) for width in settings.IMAGE_RENDITION_WIDTHS})
+    for extension, (image_format, options) in RENDITION_FORMATS.items():
+        renditions[extension] = {}
+        for width in widths:
+            resized = image.copy()
+            resized.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+            name = field_file.storage.save(
+                rendition_name(field_file.name, width, extension), _encode(resized, image_format, options)
+            )
+            renditions[extension][str(width)] = name
+    return renditions
+
+
+def delete_renditions(storage, renditions):
+    for extension in RENDITION_FORMATS:
+        for name in renditions.get(extension, {}).values():
+            storage.delete(name)
+
+
+def rendition_urls(field_file, renditions):
+    """
+    Returns the srcset map of an image ({'webp': {'480': <url>, ...}, 'jpeg': {...}})
+    or None if there are no renditions for the current file.
+    """
+    if not field_file or not renditions or renditions.get('source') != field_file.name:
+        return None
+    urls = {
+        extension: {width: field_file.storage.url(name) for width, name in renditions[extension].items()}
+        for extension in RENDITION_FORMATS if renditions.get(extension)
+    }
+    return urls or None
@@ -0,0 +1,168 @@
+import hashlib
+import io
+import mimetypes
+import posixpath
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import MediaJob, PostImage, PostDocument
+
+TASKS = {}
+
+
+def task(name):
+    """
+    Registers a function as a job task. The function receives the object_id of the job.
+    """
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(task_name, object_id, post=None):
+    """
+    Schedules a task for the worker (manage.py run_media_jobs).
+    With MEDIA_JOBS_EAGER the task runs immediately once the current transaction commits.
+    """
+    if task_name not in TASKS:
+        raise KeyError(f'Unknown media job task: {task_name}')
+    job = MediaJob.objects.create(task=task_name, object_id=object_id, post=post)
+    if settings.MEDIA_JOBS_EAGER:
+        transaction.on_commit(lambda: run_job(claim_job(job.pk)))
+    return job
+
+
+def claim_job(pk=None):
+    """
+    Marks the oldest pending job (or the given one) as running and returns it, or None if there is nothing to do.
+    Rows locked by another worker are skipped, so several workers can share the queue.
+    """
+    with transaction.atomic():
+        queryset = MediaJob.objects.select_for_update(skip_locked=True).filter(status=MediaJob.STATUS_PENDING)
+        if pk is not None:
+            queryset = queryset.filter(pk=pk)
+        job = queryset.order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+        job.status = MediaJob.STATUS_RUNNING
+        job.attempts += 1
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'attempts', 'started_at'])
+    return job
+
+
+def reclaim_stale_jobs():
+    """
+    Returns jobs left 'running' by a worker that crashed or was killed to the queue,
+    or marks them as failed once they have used up MEDIA_JOB_MAX_ATTEMPTS. Returns the number of reclaimed jobs.
+    """
+    stale = MediaJob.objects.filter(
+        status=MediaJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=settings.MEDIA_JOB_TIMEOUT),
+    )
+    error = f"Задачата не завърши за {settings.MEDIA_JOB_TIMEOUT} секунди (работникът е спрян)."
+    reclaimed = stale.filter(attempts__lt=settings.MEDIA_JOB_MAX_ATTEMPTS).update(status=MediaJob.STATUS_PENDING, error=error)
+    stale.update(status=MediaJob.STATUS_FAILED, error=error, finished_at=timezone.now())
+    return reclaimed
+
+
+def run_job(job):
+    if job is None:
+        return None
+    try:
+        TASKS[job.task](job.object_id)
+    except Exception:
+        job.status = MediaJob.STATUS_FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = MediaJob.STATUS_DONE
+        job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def run_pending(limit=None):
+    """
+    Runs pending jobs one by one in the current process and returns how many were run.
+    """
+    reclaim_stale_jobs()
+    count = 0
+    while limit is None or count < limit:
+        job = run_job(claim_job())
+        if job is None:
+            break
+        count += 1
+    return count
+
+
+def file_checksum(field_file):
+    digest = hashlib.sha256()
+    with field_file.open('rb'):
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@task('process_post_image')
+def process_post_image(object_id):
+    """
+    Downscales oversized gallery images, strips their EXIF data (applying the orientation first),
+    stores the checksum of the result and generates the responsive renditions.
+    """
+    post_image = PostImage.objects.filter(pk=object_id).first()
+    if post_image is None:
+        return
+
+    field_file = post_image.image
+    try:
+        with field_file.open('rb'):
+            image = Image.open(field_file)
+            image_format = image.format
+            needs_rewrite = (
+                not getattr(image, 'is_animated', False)
+                and (bool(image.getexif()) or 'exif' in image.info or max(image.size) > settings.MEDIA_MAX_IMAGE_SIZE)
+            )
+            if needs_rewrite:
+                image = ImageOps.exif_transpose(image)
+                image.load()
+    except UnidentifiedImageError:
+        needs_rewrite = False
+
+    if needs_rewrite:
+        image.thumbnail((settings.MEDIA_MAX_IMAGE_SIZE, settings.MEDIA_MAX_IMAGE_SIZE), Image.Resampling.LANCZOS)
+        image.info.pop('exif', None)
+        buffer = io.BytesIO()
+        options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+        image.save(buffer, image_format, **options)
+        old_name = field_file.name
+        field_file.save(posixpath.basename(old_name), ContentFile(buffer.getvalue()), save=False)
+        field_file.storage.delete(old_name)
+        # Отваряме записания файл наново от хранилището (ContentFile не може да се отвори повторно)
+        post_image.image = field_file.name
+
+    post_image.checksum = file_checksum(post_image.image)
+    post_image.update_renditions(force=needs_rewrite)
+    post_image.save(update_fields=['image', 'checksum', 'image_renditions'])
+
+
+@task('process_post_document')
+def process_post_document(object_id):
+    """
+    Stores the size, content type and checksum of an uploaded document.
+    """
+    document = PostDocument.objects.filter(pk=object_id).first()
+    if document is None:
+        return
+
+    document.size = document.file.size
+    document.content_type = mimetypes.guess_type(document.file_name or document.file.name)[0] or 'application/octet-stream'
+    document.checksum = file_checksum(document.file)
+    document.save(update_fields=['size', 'content_type', 'checksum'])
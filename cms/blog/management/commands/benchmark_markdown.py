@@ -0,0 +1,52 @@
+import time
+
+import markdown
+from django.core.management.base import BaseCommand
+
+from blog.models import Notification, Posts
+from blog.rendering import MarkdownRenderer, sanitize_html
+
+
+class Command(BaseCommand):
+    help = "Сравнява рендерирането с нов markdown.Markdown при всяко извикване и споделения MarkdownRenderer върху текстовете от базата."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20, help="Колко пъти да се рендерира всеки текст.")
+
+    def handle(self, *args, **options):
+        samples = {
+            'известия': (list(Notification.objects.values_list('text', flat=True)), ['nl2br']),
+            'публикации': (list(Posts.objects.values_list('content', flat=True)), []),
+        }
+        for name, (texts, extensions) in samples.items():
+            if not texts:
+                self.stdout.write(f"{name}: няма записи")
+                continue
+            rounds = options['rounds']
+
+            started = time.perf_counter()
+            for _ in range(rounds):
+                for text in texts:
+                    sanitize_html(markdown.markdown(text, extensions=extensions))
+            baseline = time.perf_counter() - started
+
+            renderer = MarkdownRenderer(maxsize=len(texts))
+            started = time.perf_counter()
+            for text in texts:
+                renderer.render(text, extensions)
+            cold = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for _ in range(rounds):
+                for text in texts:
+                    renderer.render(text, extensions)
+            warm = time.perf_counter() - started
+
+            calls = rounds * len(texts)
+            self.stdout.write(
+                f"{name} ({len(texts)} текста): "
+                f"нов Markdown {baseline / calls * 1000:.3f} ms, "
+                f"преизползван без кеш {cold / len(texts) * 1000:.3f} ms, "
+                f"с кеш {warm / calls * 1000:.4f} ms на текст "
+                f"(x{baseline / warm:.0f}); {renderer.cache_info()}"
+            )
@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from blog.models import MemeOfWeek
+from blog.votes import add_vote, flush_votes
+
+
+class Command(BaseCommand):
+    help = "Сравнява синхронното и буферираното гласуване при много паралелни гласове за едно меме."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=32)
+
+    def handle(self, *args, **options):
+        voters = User.objects.bulk_create(
+            [User(username=f'benchmark-voter-{i}') for i in range(options['voters'])]
+        )
+        try:
+            for buffering in (False, True):
+                elapsed = self.run(voters, options['workers'], buffering)
+                mode = 'буферирано' if buffering else 'синхронно'
+                self.stdout.write(
+                    f"{mode}: {len(voters)} гласа за {elapsed:.2f} s ({len(voters) / elapsed:.0f} гласа/s)"
+                )
+        finally:
+            User.objects.filter(pk__in=[voter.pk for voter in voters]).delete()
+
+    def run(self, voters, workers, buffering):
+        meme = MemeOfWeek.objects.create(user=voters[0], title='benchmark', is_approved=True)
+
+        def vote(user):
+            try:
+                return add_vote(meme, user)
+            finally:
+                connection.close()
+
+        try:
+            with override_settings(VOTE_BUFFERING=buffering):
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(vote, voters))
+                elapsed = time.perf_counter() - started
+            flush_votes(MemeOfWeek)
+            meme.refresh_from_db()
+            if not all(results) or meme.votes != len(voters):
+                raise CommandError(f"Очаквани {len(voters)} гласа, преброени {meme.votes}.")
+            return elapsed
+        finally:
+            meme.delete()
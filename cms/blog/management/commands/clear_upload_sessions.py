@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.models import UploadSession
+from blog.uploads import discard
+
+
+class Command(BaseCommand):
+    help = "Изтрива изоставените качвания на части (без активност повече от UPLOAD_SESSION_TIMEOUT) и временните им файлове."
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TIMEOUT)
+        sessions = UploadSession.objects.filter(updated_at__lt=cutoff)
+        count = 0
+        for session in sessions.iterator():
+            discard(session)
+            count += 1
+        sessions.delete()
+        self.stdout.write(f"Изтрити качвания: {count}")
@@ -0,0 +1,110 @@
+import os
+import posixpath
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.cache import bump_model_version
+from blog.images import RENDITION_FORMATS
+from blog.models import Posts, PostImage, PostDocument, MemeOfWeek, PollQuestion, PollOption, StoredFile
+from blog.polls import invalidate_active_poll
+from blog.storage import ContentAddressedStorage
+
+# Файловите полета, които се съхраняват по съдържание
+MEDIA_FILE_FIELDS = (
+    (Posts, 'banner'),
+    (PostImage, 'image'),
+    (PostDocument, 'file'),
+    (MemeOfWeek, 'image'),
+    (PollQuestion, 'image'),
+    (PollOption, 'image'),
+)
+
+
+class Command(BaseCommand):
+    help = "Премества вече качените файлове в хранилището по съдържание (ContentAddressedStorage), премахва дубликатите и преброява използванията."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--purge-untracked', action='store_true',
+            help="Изтрива и файловете в cas/ без запис в базата. Може да засегне качвания в ход - пускайте го само при спрян сайт.",
+        )
+
+    def handle(self, *args, **options):
+        self.storage = storages['default']
+        if not isinstance(self.storage, ContentAddressedStorage):
+            raise CommandError("STORAGES['default'] трябва да е 'blog.storage.ContentAddressedStorage'.")
+
+        for model, field in MEDIA_FILE_FIELDS:
+            moved = 0
+            for obj in model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).iterator():
+                if self.move(obj, field):
+                    moved += 1
+            bump_model_version(model)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: преместени {moved}")
+        invalidate_active_poll()
+
+        references = self.count_references()
+        released = self.rebuild_references(references, options['purge_untracked'])
+        self.stdout.write(f"Съхранени файлове: {len(references)}, изтрити излишни: {released}")
+
+    def move(self, obj, field):
+        field_file = getattr(obj, field)
+        if field_file.name.startswith(ContentAddressedStorage.prefix + '/'):
+            return False
+        old_name = field_file.name
+        if not self.storage.exists(old_name):
+            self.stderr.write(f"Липсва файл: {old_name}")
+            return False
+
+        with self.storage.open(old_name) as content:
+            new_name = self.storage.save(old_name, content)
+        changes = {field: new_name}
+        if isinstance(obj, PostDocument) and not obj.file_name:
+            changes['file_name'] = posixpath.basename(old_name)
+
+        setattr(obj, field, new_name)
+        if getattr(obj, 'rendition_fields', None):
+            # Производните размери на стария път се изтриват и се генерират наново в хранилището
+            changes.update({target: getattr(obj, target) for target in obj.update_renditions([field])})
+        type(obj).objects.filter(pk=obj.pk).update(**changes)
+        FileSystemStorage.delete(self.storage, old_name)
+        return True
+
+    def count_references(self):
+        references = Counter()
+        for model, field in MEDIA_FILE_FIELDS:
+            references.update(name for name in model.objects.exclude(**{field: ''}).values_list(field, flat=True) if name)
+            target = getattr(model, 'rendition_fields', {}).get(field)
+            if target:
+                for renditions in model.objects.values_list(target, flat=True):
+                    for extension in RENDITION_FORMATS:
+                        references.update((renditions or {}).get(extension, {}).values())
+        return Counter({name: count for name, count in references.items() if name.startswith(ContentAddressedStorage.prefix + '/')})
+
+    def rebuild_references(self, references, purge_untracked):
+        for name, count in references.items():
+            updated = StoredFile.objects.filter(name=name).update(references=count)
+            if not updated and self.storage.exists(name):
+                checksum = posixpath.splitext(posixpath.basename(name))[0]
+                StoredFile.objects.create(name=name, checksum=checksum, size=self.storage.size(name), references=count)
+
+        released = 0
+        for stored in StoredFile.objects.exclude(name__in=list(references)):
+            FileSystemStorage.delete(self.storage, stored.name)
+            stored.delete()
+            released += 1
+
+        if not purge_untracked:
+            return released
+
+        # Файлове в хранилището без запис (напр. от прекъснато качване)
+        root = os.path.join(self.storage.location, ContentAddressedStorage.prefix)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                name = posixpath.join(*os.path.relpath(os.path.join(directory, filename), self.storage.location).split(os.sep))
+                if name not in references:
+                    FileSystemStorage.delete(self.storage, name)
+                    released += 1
+        return released
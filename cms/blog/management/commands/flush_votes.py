@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.models import BellSongSuggestion, MemeOfWeek
+from blog.votes import flush_votes
+
+
+class Command(BaseCommand):
+    help = "Пренася буферираните гласове (VOTE_BUFFERING) в брояча 'votes' на песните и мемета."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Брой записи в една UPDATE заявка.")
+        parser.add_argument('--full', action='store_true', help="Преброява наново всички записи, не само гласуваните след последното пренасяне.")
+        parser.add_argument('--interval', type=int, default=0, help="Ако е зададен, командата се повтаря на всеки N секунди.")
+
+    def handle(self, *args, **options):
+        while True:
+            for model in (MemeOfWeek, BellSongSuggestion):
+                updated = flush_votes(model, batch_size=options['batch_size'], full=options['full'])
+                if updated:
+                    self.stdout.write(f"{model._meta.verbose_name_plural}: обновени {updated}")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
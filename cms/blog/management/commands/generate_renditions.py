@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from blog.cache import bump_model_version
+from blog.models import Posts, PostImage, MemeOfWeek, PollQuestion, PollOption
+from blog.polls import invalidate_active_poll
+
+RENDITION_MODELS = (Posts, PostImage, MemeOfWeek, PollQuestion, PollOption)
+
+
+class Command(BaseCommand):
+    help = "Генерира производните WebP/JPEG размери на вече качените изображения (банери, галерии, мемета и анкети)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Генерира наново и изображенията, които вече имат производни размери.")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Брой записи, зареждани наведнъж от базата.")
+
+    def handle(self, *args, **options):
+        for model in RENDITION_MODELS:
+            count = 0
+            for obj in model.objects.iterator(chunk_size=options['chunk_size']):
+                updated = obj.update_renditions(force=options['force'])
+                if updated:
+                    # update() не извиква save(), за да не се рендерира наново съдържанието на публикациите
+                    model.objects.filter(pk=obj.pk).update(**{field: getattr(obj, field) for field in updated})
+                    count += 1
+            # update() не изпраща сигнали
+            bump_model_version(model)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {count}")
+        invalidate_active_poll()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import PollScore
+
+
+class Command(BaseCommand):
+    help = "Преизчислява класацията от анкетите (PollScore) от всички отговори."
+
+    def handle(self, *args, **options):
+        count = PollScore.rebuild()
+        self.stdout.write(f"Преизчислени резултати: {count}")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from blog.cache import bump_model_version
+from blog.models import Posts
+from blog.search import get_backend, index_posts
+
+
+class Command(BaseCommand):
+    help = "Изгражда наново индекса за търсене на публикациите на партиди (паметта не зависи от броя на публикациите). Пуска се и след миграция 0051."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Брой публикации, индексирани в една транзакция.")
+
+    def handle(self, *args, **options):
+        if get_backend() != 'index':
+            self.stdout.write("Търсенето използва FULLTEXT индекса на MySQL, който се поддържа от базата.")
+            return
+
+        total = Posts.objects.count()
+        batch = []
+        count = 0
+        queryset = Posts.objects.only(*Posts.search_fields).order_by('pk')
+        for post in queryset.iterator(chunk_size=options['batch_size']):
+            batch.append(post)
+            if len(batch) >= options['batch_size']:
+                count += self.flush(batch, count, total)
+        count += self.flush(batch, count, total)
+        bump_model_version(Posts)
+        self.stdout.write(f"Индексирани публикации: {count}")
+
+    def flush(self, batch, count, total):
+        size = len(batch)
+        if batch:
+            index_posts(batch)
+            batch.clear()
+            self.stdout.write(f"{count + size}/{total}")
+        return size
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from blog.cache import bump_model_version
+from blog.models import Notification, Event, Changelog, TermsOfService, PrivacyPolicy, Posts
+
+MARKDOWN_MODELS = (Notification, Event, Changelog, TermsOfService, PrivacyPolicy, Posts)
+
+
+class Command(BaseCommand):
+    help = "Генерира наново HTML полетата на всички записи с Markdown съдържание (напр. след миграция)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Брой записи в една UPDATE заявка.")
+
+    def handle(self, *args, **options):
+        for model in MARKDOWN_MODELS:
+            html_fields = list(model.get_rendered_fields(model.markdown_fields))
+            batch = []
+            count = 0
+            for obj in model.objects.iterator(chunk_size=options['batch_size']):
+                obj.render_markdown_fields()
+                batch.append(obj)
+                if len(batch) >= options['batch_size']:
+                    count += self.flush(model, batch, html_fields)
+            count += self.flush(model, batch, html_fields)
+            # bulk_update не изпраща сигнали и не променя auto_now полетата (напр. Changelog.updated_at)
+            bump_model_version(model)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {count}")
+
+    def flush(self, model, batch, html_fields):
+        count = len(batch)
+        if batch:
+            model.objects.bulk_update(batch, html_fields)
+            batch.clear()
+        return count
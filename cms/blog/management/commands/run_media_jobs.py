@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Изпълнява фоновите задачи за качени файлове (смаляване на снимки, EXIF, контролни суми, метаданни)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Изпълнява чакащите задачи и спира.")
+        parser.add_argument('--interval', type=float, default=2, help="Пауза в секунди, когато опашката е празна.")
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending()
+            if count:
+                self.stdout.write(f"Изпълнени задачи: {count}")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
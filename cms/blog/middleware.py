@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .models import SiteSettings
+
+# Пътища, които остават достъпни по време на поддръжка
+MAINTENANCE_ALLOWED_PATHS = (
+    '/api/site-status/',
+    '/api/auth/token/',
+)
+
+
+class MaintenanceModeMiddleware:
+    """
+    Short-circuits API requests from non-staff users with 503 while SiteSettings.maintenance_mode is on.
+    The flag comes from SiteSettings.load(), so outside maintenance the check costs no queries.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            request.path.startswith('/api/')
+            and not request.path.startswith(MAINTENANCE_ALLOWED_PATHS)
+            and SiteSettings.load().maintenance_mode
+            and not self.is_staff(request)
+        ):
+            response = JsonResponse(
+                {"detail": "Сайтът е в режим на поддръжка. Моля, опитайте по-късно."},
+                status=503
+            )
+            response['Retry-After'] = str(settings.MAINTENANCE_RETRY_AFTER)
+            return response
+        return self.get_response(request)
+
+    def is_staff(self, request):
+        # Администраторите влизат или със сесия (админ панела), или с JWT токен (API-то)
+        if request.user.is_authenticated:
+            return request.user.is_staff
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except (InvalidToken, AuthenticationFailed):
+            return False
+        return result is not None and result[0].is_staff
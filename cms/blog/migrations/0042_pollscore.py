@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_poll_scores(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    PollScore = apps.get_model('blog', 'PollScore')
+    totals = User.objects.annotate(
+        total_correct=models.Count('pollanswer', filter=models.Q(pollanswer__selected_option__is_correct=True)),
+        total_last_answered=models.Max('pollanswer__created_at'),
+    ).filter(total_last_answered__isnull=False).values_list('pk', 'total_correct', 'total_last_answered')
+    PollScore.objects.bulk_create(
+        [PollScore(user_id=user_id, correct_answers=correct, last_answered=last_answered) for user_id, correct, last_answered in totals],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0041_remove_pollquestion_code_polloption_image_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('correct_answers', models.PositiveIntegerField(default=0, help_text='Брой верни отговори на анкети.', verbose_name='Верни отговори')),
+                ('last_answered', models.DateTimeField(blank=True, help_text='Дата и час на последния отговор. Формат: YYYY-MM-DD HH:MM:SS.', null=True, verbose_name='Последен отговор')),
+                ('user', models.OneToOneField(help_text='Потребителят, за когото е резултатът.', on_delete=django.db.models.deletion.CASCADE, related_name='poll_score', to=settings.AUTH_USER_MODEL, verbose_name='Потребител')),
+            ],
+            options={
+                'verbose_name': 'Резултат от анкети',
+                'verbose_name_plural': 'Резултати от анкети',
+                'indexes': [models.Index(fields=['-correct_answers'], name='pollscore_correct_idx'), models.Index(fields=['-last_answered'], name='pollscore_last_answered_idx')],
+            },
+        ),
+        migrations.RunPython(build_poll_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+def remove_duplicate_answers(apps, schema_editor):
+    """
+    Keeps only the first answer of every user per question and recomputes the affected poll scores.
+    """
+    PollAnswer = apps.get_model('blog', 'PollAnswer')
+    PollScore = apps.get_model('blog', 'PollScore')
+
+    duplicates = PollAnswer.objects.values('user_id', 'question_id').annotate(
+        first_id=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1)
+
+    affected_users = set()
+    for duplicate in duplicates:
+        PollAnswer.objects.filter(
+            user_id=duplicate['user_id'], question_id=duplicate['question_id']
+        ).exclude(id=duplicate['first_id']).delete()
+        affected_users.add(duplicate['user_id'])
+
+    for user_id in affected_users:
+        answers = PollAnswer.objects.filter(user_id=user_id)
+        PollScore.objects.filter(user_id=user_id).update(
+            correct_answers=answers.filter(selected_option__is_correct=True).count(),
+            last_answered=answers.aggregate(last=models.Max('created_at'))['last'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0042_pollscore'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pollanswer',
+            constraint=models.UniqueConstraint(fields=('user', 'question'), name='unique_poll_answer_per_user'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-17 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0043_pollanswer_unique_poll_answer_per_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='posts',
+            index=models.Index(fields=['published', 'allowed', '-created_at', '-id'], name='posts_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comments',
+            index=models.Index(fields=['post', 'created_at'], name='comments_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comments',
+            index=models.Index(fields=['user', 'created_at'], name='comments_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bellsongsuggestion',
+            index=models.Index(fields=['status', '-votes', '-submitted_at'], name='bellsong_status_votes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memeofweek',
+            index=models.Index(fields=['is_approved', '-votes', '-created_at'], name='meme_approved_votes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pollquestion',
+            index=models.Index(fields=['end_date', 'start_date'], name='pollquestion_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['enabled', '-created_at'], name='notification_enabled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['published', 'start_datetime'], name='event_published_start_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-17 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0044_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False, help_text='HTML на промените. Генерира се автоматично при запис.'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='description_html',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Генерира се автоматично от описанието при запис.', verbose_name='Описание (HTML)'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='html_text',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Генерира се автоматично от текста при запис.', verbose_name='HTML на известието'),
+        ),
+        migrations.AddField(
+            model_name='privacypolicy',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False, help_text='HTML на политиката. Генерира се автоматично при запис.'),
+        ),
+        migrations.AddField(
+            model_name='termsofservice',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False, help_text='HTML на условията. Генерира се автоматично при запис.'),
+        ),
+    ]
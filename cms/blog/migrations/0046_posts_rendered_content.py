@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0045_rendered_markdown_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False, help_text='HTML на съдържанието. Генерира се автоматично при запис.'),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='content_outline',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Заглавията в съдържанието (ниво, текст и котва) за съдържанието на страницата.'),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Брой думи'),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='В минути.', verbose_name='Време за четене'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-17 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0046_posts_rendered_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memeofweek',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.'),
+        ),
+        migrations.AddField(
+            model_name='polloption',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.'),
+        ),
+        migrations.AddField(
+            model_name='pollquestion',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.'),
+        ),
+        migrations.AddField(
+            model_name='postimage',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.'),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='banner_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-17 17:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0047_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postdocument',
+            name='checksum',
+            field=models.CharField(blank=True, default='', editable=False, help_text='SHA-256 на файла.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='postdocument',
+            name='content_type',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Тип на съдържанието'),
+        ),
+        migrations.AddField(
+            model_name='postdocument',
+            name='size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Размер на файла в байтове.', null=True, verbose_name='Размер'),
+        ),
+        migrations.AddField(
+            model_name='postimage',
+            name='checksum',
+            field=models.CharField(blank=True, default='', editable=False, help_text='SHA-256 на обработения файл.', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(help_text='Името на задачата (виж blog/jobs.py).', max_length=50, verbose_name='Задача')),
+                ('object_id', models.PositiveBigIntegerField(help_text='Записът, който задачата обработва.', verbose_name='ID на обекта')),
+                ('status', models.CharField(choices=[('pending', 'Чака'), ('running', 'Обработва се'), ('done', 'Готово'), ('failed', 'Грешка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Опити')),
+                ('error', models.TextField(blank=True, default='', help_text='Последната грешка при изпълнение.', verbose_name='Грешка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Създадена на')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Започната на')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завършена на')),
+                ('post', models.ForeignKey(blank=True, help_text='Публикацията, към която е файлът.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to='blog.posts', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'Обработка на файл',
+                'verbose_name_plural': 'Обработка на файлове',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='mediajob_status_created_idx')],
+            },
+        ),
+    ]
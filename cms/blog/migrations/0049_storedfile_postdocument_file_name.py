@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-17 18:00
+
+import posixpath
+
+from django.db import migrations, models
+
+
+def fill_file_names(apps, schema_editor):
+    PostDocument = apps.get_model('blog', 'PostDocument')
+    documents = list(PostDocument.objects.exclude(file=''))
+    for document in documents:
+        document.file_name = posixpath.basename(document.file.name)
+    PostDocument.objects.bulk_update(documents, ['file_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0048_mediajob_and_file_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Пътят на файла в хранилището.', max_length=255, unique=True, verbose_name='Път')),
+                ('checksum', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('size', models.PositiveBigIntegerField(help_text='Размер на файла в байтове.', verbose_name='Размер')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Брой използвания')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Създаден на')),
+            ],
+            options={
+                'verbose_name': 'Съхранен файл',
+                'verbose_name_plural': 'Съхранени файлове',
+            },
+        ),
+        migrations.AddField(
+            model_name='postdocument',
+            name='file_name',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Оригиналното име на качения файл.', max_length=255, verbose_name='Име на файла'),
+        ),
+        migrations.RunPython(fill_file_names, migrations.RunPython.noop),
+    ]
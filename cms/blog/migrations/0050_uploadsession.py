@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-17 19:00
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0049_storedfile_postdocument_file_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('document', 'Документ'), ('image', 'Изображение')], max_length=10, verbose_name='Вид')),
+                ('file_name', models.CharField(max_length=255, verbose_name='Име на файла')),
+                ('size', models.PositiveBigIntegerField(help_text='Очакваният размер на файла в байтове.', verbose_name='Размер')),
+                ('checksum', models.CharField(help_text='Очакваната контролна сума на целия файл.', max_length=64, verbose_name='SHA-256')),
+                ('received', models.PositiveBigIntegerField(default=0, verbose_name='Получени байтове')),
+                ('status', models.CharField(choices=[('open', 'Качва се'), ('complete', 'Завършено')], default='open', max_length=10, verbose_name='Статус')),
+                ('object_id', models.PositiveBigIntegerField(blank=True, help_text='ID на документа или снимката след завършване.', null=True, verbose_name='Създаден запис')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Започнато на')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Последна промяна')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='blog.posts', verbose_name='Публикация')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Потребител')),
+            ],
+            options={
+                'verbose_name': 'Качване на части',
+                'verbose_name_plural': 'Качвания на части',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-17 20:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Индексът за търсене на съществуващите публикации (извън MySQL) се изгражда след миграцията с
+# `manage.py rebuild_search_index`, за да не зависи миграцията от текущия код на search.py
+
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE blog_posts ADD FULLTEXT INDEX posts_fulltext_idx (title, hook, content)')
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE blog_posts DROP INDEX posts_fulltext_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0050_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(help_text='Нормализирана основа на думата.', max_length=64, verbose_name='Дума')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Тегло')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='blog.posts', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'Дума от индекса за търсене',
+                'verbose_name_plural': 'Индекс за търсене',
+                'indexes': [models.Index(fields=['term', 'post'], name='postsearchterm_term_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'term'), name='unique_post_search_term')],
+            },
+        ),
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-17 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0051_postsearchterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(help_text='Моделът на гласувания обект (напр. blog.memeofweek).', max_length=100, verbose_name='Модел')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID на обекта')),
+            ],
+            options={
+                'verbose_name': 'Непренесен глас',
+                'verbose_name_plural': 'Непренесени гласове',
+                'indexes': [models.Index(fields=['label', 'id'], name='pendingvote_label_idx')],
+            },
+        ),
+    ]
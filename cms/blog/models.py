@@ -1,9 +1,14 @@
+import posixpath
+import time
 import uuid
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.db.models import BooleanField
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from .cache import get_model_versions
+from .images import generate_renditions, delete_renditions
+from .rendering import render_markdown, render_document
 
 def post_media_upload_path(instance, filename, field_type):
     """
@@ -53,6 +58,84 @@ def poll_media_upload_path(instance, filename):
     # Fallback path
     return f'polls/unknown/{filename}'
 
+class MarkdownRenderedModel(models.Model):
+    """
+    Abstract base for models with Markdown content.
+    The sanitized HTML of every field in `markdown_fields` (source field -> (HTML field, extensions))
+    is stored on save, so read paths never run the Markdown engine.
+    """
+    markdown_fields = {}
+
+    class Meta:
+        abstract = True
+
+    def render_markdown_fields(self):
+        for source, (target, extensions) in self.markdown_fields.items():
+            setattr(self, target, render_markdown(getattr(self, source), extensions))
+
+    @classmethod
+    def get_rendered_fields(cls, sources):
+        """
+        Returns the generated fields that depend on the given source fields.
+        """
+        return {target for source, (target, extensions) in cls.markdown_fields.items() if source in sources}
+
+    def save(self, *args, **kwargs):
+        self.render_markdown_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | self.get_rendered_fields(update_fields)
+        return super().save(*args, **kwargs)
+
+
+class ImageRenditionsModel(models.Model):
+    """
+    Abstract base for models with uploaded images.
+    Every image field in `rendition_fields` (image field -> JSON field) gets resized WebP/JPEG copies
+    when a new file is saved; the JSON field describes them (see images.generate_renditions).
+    """
+    rendition_fields = {}
+    # Ако е True, save() не генерира производните размери (напр. когато това ще стане във фонова задача, виж jobs.py)
+    defer_renditions = False
+
+    class Meta:
+        abstract = True
+
+    def update_renditions(self, sources=None, force=False):
+        """
+        Regenerates the renditions of changed images and returns the names of the updated JSON fields.
+        """
+        updated = set()
+        for source, target in self.rendition_fields.items():
+            if sources is not None and source not in sources:
+                continue
+            field_file = getattr(self, source)
+            renditions = getattr(self, target) or {}
+            if not field_file:
+                if renditions:
+                    delete_renditions(field_file.storage, renditions)
+                    setattr(self, target, {})
+                    updated.add(target)
+                continue
+            if not field_file._committed:
+                # Записваме файла предварително (както би го направил FileField.pre_save), за да можем да го обработим
+                field_file.save(field_file.name, field_file.file, save=False)
+                # FieldFile.save() заменя стойността на полето, затова отбелязваме, че файлът е качен при този запис (виж signals.py)
+                self._saved_file_fields = getattr(self, '_saved_file_fields', set()) | {source}
+            if force or renditions.get('source') != field_file.name:
+                delete_renditions(field_file.storage, renditions)
+                setattr(self, target, generate_renditions(field_file))
+                updated.add(target)
+        return updated
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        updated = set() if self.defer_renditions else self.update_renditions(update_fields)
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | updated
+        return super().save(*args, **kwargs)
+
+
 class Category(models.Model):
     full_name = models.CharField(max_length=100, help_text="Пълното име на категорията, което ще се показва на сайта.")
     short_name = models.SlugField(max_length=100, unique=True, help_text="Кратко име в URL съвместим формат (слаг). Например: 'novini-ot-uchilishte'.")
@@ -63,7 +146,7 @@ class Category(models.Model):
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
 
-class Posts(models.Model):
+class Posts(MarkdownRenderedModel, ImageRenditionsModel):
     title = models.CharField(max_length=100, blank=False, help_text="Заглавието на публикацията.")
     category = models.ForeignKey(Category, on_delete=models.CASCADE, help_text="Категорията, към която принадлежи публикацията.")
     banner = models.ImageField(upload_to=post_banner_upload_path, blank=True, null=True, help_text="Банер изображение, което ще се показва в горната част на публикацията.")
@@ -73,6 +156,18 @@ class Posts(models.Model):
     created_at = models.DateTimeField(default=timezone.now, help_text="Дата и час на създаване на публикацията. Формат: YYYY-MM-DD HH:MM:SS.")
     published = BooleanField(help_text="Отбележете, ако публикацията трябва да бъде видима за всички потребители.")
     allowed = models.BooleanField(default=False, help_text="Отбележете, за да одобрите публикацията за показване (за публикации, изискващи одобрение).")
+    content_html = models.TextField(blank=True, default='', editable=False, help_text="HTML на съдържанието. Генерира се автоматично при запис.")
+    content_outline = models.JSONField(blank=True, default=list, editable=False, help_text="Заглавията в съдържанието (ниво, текст и котва) за съдържанието на страницата.")
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Брой думи")
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name="Време за четене", help_text="В минути.")
+    banner_renditions = models.JSONField(blank=True, default=dict, editable=False, help_text="Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.")
+
+    markdown_fields = {'content': ('content_html', [])}
+    rendition_fields = {'banner': 'banner_renditions'}
+    # Полета, които се изчисляват заедно с content_html
+    content_metadata_fields = ('content_outline', 'word_count', 'reading_time')
+    # Полетата, от които се изгражда индексът за търсене (виж search.FIELD_WEIGHTS)
+    search_fields = ('title', 'hook', 'content')
 
     class Meta:
         permissions = [
@@ -84,10 +179,34 @@ class Posts(models.Model):
         ]
         verbose_name = "Публикация"
         verbose_name_plural = "Публикации"
+        indexes = [
+            models.Index(fields=['published', 'allowed', '-created_at', '-id'], name='posts_feed_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запомняме заредения текст, за да се преиндексира само при реална промяна (виж signals.update_search_index)
+        if all(field in field_names for field in cls.search_fields):
+            instance._search_source = instance.get_search_source()
+        return instance
+
+    def get_search_source(self):
+        return tuple(getattr(self, field) for field in self.search_fields)
+
+    def render_markdown_fields(self):
+        self.content_html, self.content_outline, self.word_count, self.reading_time = render_document(self.content)
+
+    @classmethod
+    def get_rendered_fields(cls, sources):
+        fields = super().get_rendered_fields(sources)
+        if 'content' in sources:
+            fields.update(cls.content_metadata_fields)
+        return fields
+
 class Comments(models.Model):
     content = models.TextField(blank=False, help_text="Съдържанието на коментара.")
     user = models.ForeignKey(User, on_delete=models.CASCADE, help_text="Потребителят, който е написал коментара.")
@@ -97,6 +216,10 @@ class Comments(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'created_at'], name='comments_post_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='comments_user_created_idx'),
+        ]
 
     def __str__(self):
         return self.content
@@ -132,11 +255,14 @@ class BellSongSuggestion(models.Model):
         verbose_name = "Предложение за песен за звънец"
         verbose_name_plural = "Предложения за песни за звънец"
         ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['status', '-votes', '-submitted_at'], name='bellsong_status_votes_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.get_status_display()})"
 
-class MemeOfWeek(models.Model):
+class MemeOfWeek(ImageRenditionsModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Потребител", help_text="Потребителят, който е качил мемето.")
     title = models.CharField(max_length=100, blank=True, null=True, verbose_name="Заглавие", help_text="Заглавие на мемето (по избор).")
     image = models.ImageField(upload_to=meme_upload_path, blank=True, null=True, verbose_name="Изображение", help_text="Файлът с изображението на мемето.")
@@ -144,17 +270,41 @@ class MemeOfWeek(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата на качване", null=True, help_text="Дата и час на качване на мемето. Формат: YYYY-MM-DD HH:MM:SS.")
     voted_by = models.ManyToManyField(User, related_name='voted_memes', blank=True, verbose_name="Гласували потребители", help_text="Потребители, които са гласували за това меме.")
     votes = models.IntegerField(default=0, verbose_name="Гласове", help_text="Брой на гласовете за мемето.")
+    image_renditions = models.JSONField(blank=True, default=dict, editable=False, help_text="Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.")
+
+    rendition_fields = {'image': 'image_renditions'}
 
     class Meta:
         verbose_name = "Меме на седмицата"
         verbose_name_plural = "Мемета на седмицата"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_approved', '-votes', '-created_at'], name='meme_approved_votes_idx'),
+        ]
 
     def __str__(self):
         if self.title:
             return self.title
         return f"Meme by {self.user.username}"
 
+
+class PendingVote(models.Model):
+    """
+    A vote recorded with VOTE_BUFFERING whose item counter is not updated yet (see votes.flush_votes).
+    """
+    label = models.CharField(max_length=100, verbose_name="Модел", help_text="Моделът на гласувания обект (напр. blog.memeofweek).")
+    object_id = models.PositiveBigIntegerField(verbose_name="ID на обекта")
+
+    class Meta:
+        verbose_name = "Непренесен глас"
+        verbose_name_plural = "Непренесени гласове"
+        indexes = [
+            models.Index(fields=['label', 'id'], name='pendingvote_label_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.label} #{self.object_id}"
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, help_text="Свързаният потребителски акаунт.")
 
@@ -185,7 +335,7 @@ class Cookie(models.Model):
             return f"Consent: {self.consent_status} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
 
-class PollQuestion(models.Model):
+class PollQuestion(ImageRenditionsModel):
     title = models.CharField(max_length=255, verbose_name="Заглавие", help_text="Заглавието на анкетата.")
     subtitle = models.CharField(max_length=255, blank=True, null=True, verbose_name="Подзаглавие", help_text="Подзаглавие на анкетата (по избор).")
     task_description = models.TextField(verbose_name="Описание на задачата", help_text="Текст на въпроса или описание на задачата.", blank=True, default='')
@@ -193,6 +343,9 @@ class PollQuestion(models.Model):
     start_date = models.DateTimeField(verbose_name="Начална дата", default=timezone.now, help_text="Дата и час, от които анкетата е активна. Формат: YYYY-MM-DD HH:MM:SS.")
     end_date = models.DateTimeField(verbose_name="Крайна дата", default=timezone.now, help_text="Дата и час, до които анкетата е активна. Формат: YYYY-MM-DD HH:MM:SS.")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Създаден на", help_text="Дата и час на създаване на анкетата. Формат: YYYY-MM-DD HH:MM:SS.")
+    image_renditions = models.JSONField(blank=True, default=dict, editable=False, help_text="Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.")
+
+    rendition_fields = {'image': 'image_renditions'}
 
     def __str__(self):
         return self.title
@@ -201,14 +354,21 @@ class PollQuestion(models.Model):
         verbose_name = "Въпрос за анкета"
         verbose_name_plural = "Въпроси за анкети"
         ordering = ['-start_date']
+        indexes = [
+            # end_date е първо: старите анкети се трупат в миналото, а end_date >= сега избира само текущите и бъдещите
+            models.Index(fields=['end_date', 'start_date'], name='pollquestion_active_idx'),
+        ]
 
 
-class PollOption(models.Model):
+class PollOption(ImageRenditionsModel):
     question = models.ForeignKey(PollQuestion, related_name='options', on_delete=models.CASCADE, verbose_name="Въпрос", help_text="Въпросът, към който принадлежи тази опция.")
     text = models.CharField(max_length=255, verbose_name="Текст на опция", help_text="Текстът на отговора.")
     image = models.ImageField(upload_to=poll_media_upload_path, blank=True, null=True, verbose_name="Изображение към опция", help_text="Изображение, което се показва с тази опция.")
     is_correct = models.BooleanField(default=False, verbose_name="Правилен отговор", help_text="Отбележете, ако това е правилният отговор на въпроса.")
     key = models.CharField(max_length=1, choices=[('a', 'A'), ('b', 'B'), ('c', 'C'), ('d', 'D')], verbose_name="Ключ", help_text="Буквеният ключ за тази опция (a, b, c, d).")
+    image_renditions = models.JSONField(blank=True, default=dict, editable=False, help_text="Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.")
+
+    rendition_fields = {'image': 'image_renditions'}
 
     def __str__(self):
         return f"{self.question.title} - {self.text}"
@@ -233,6 +393,66 @@ class PollAnswer(models.Model):
         verbose_name = "Отговор на анкета"
         verbose_name_plural = "Отговори на анкети"
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'question'], name='unique_poll_answer_per_user'),
+        ]
+
+
+class PollScore(models.Model):
+    """
+    Denormalized per-user poll score, maintained on every answer (see record_answer)
+    and rebuildable with `manage.py rebuild_poll_scores`.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='poll_score', verbose_name="Потребител", help_text="Потребителят, за когото е резултатът.")
+    correct_answers = models.PositiveIntegerField(default=0, verbose_name="Верни отговори", help_text="Брой верни отговори на анкети.")
+    last_answered = models.DateTimeField(null=True, blank=True, verbose_name="Последен отговор", help_text="Дата и час на последния отговор. Формат: YYYY-MM-DD HH:MM:SS.")
+
+    def __str__(self):
+        return f"{self.user.username}: {self.correct_answers}"
+
+    class Meta:
+        verbose_name = "Резултат от анкети"
+        verbose_name_plural = "Резултати от анкети"
+        indexes = [
+            models.Index(fields=['-correct_answers'], name='pollscore_correct_idx'),
+            models.Index(fields=['-last_answered'], name='pollscore_last_answered_idx'),
+        ]
+
+    @classmethod
+    def record_answer(cls, answer, is_correct):
+        if cls._add_answer(answer, is_correct):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=answer.user_id, correct_answers=int(is_correct), last_answered=answer.created_at)
+        except IntegrityError:
+            # Едновременен първи отговор (на друга анкета) вече е създал реда - добавяме към него
+            cls._add_answer(answer, is_correct)
+
+    @classmethod
+    def _add_answer(cls, answer, is_correct):
+        return cls.objects.filter(user_id=answer.user_id).update(
+            correct_answers=models.F('correct_answers') + int(is_correct),
+            last_answered=answer.created_at,
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recomputes every score from PollAnswer. Returns the number of scores written.
+        """
+        totals = User.objects.annotate(
+            total_correct=models.Count('pollanswer', filter=models.Q(pollanswer__selected_option__is_correct=True)),
+            total_last_answered=models.Max('pollanswer__created_at'),
+        ).filter(total_last_answered__isnull=False).values_list('pk', 'total_correct', 'total_last_answered')
+        scores = [
+            cls(user_id=user_id, correct_answers=correct, last_answered=last_answered)
+            for user_id, correct, last_answered in totals
+        ]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(scores, batch_size=500)
+        return len(scores)
 
 
 class ContactSubmission(models.Model):
@@ -267,11 +487,14 @@ class ContactSubmission(models.Model):
         ordering = ['-submitted_at']
 
 
-class Notification(models.Model):
+class Notification(MarkdownRenderedModel):
     text = models.TextField(verbose_name="Текст на известието", help_text="Съдържанието на известието, което ще се показва на потребителите.")
+    html_text = models.TextField(blank=True, default='', editable=False, verbose_name="HTML на известието", help_text="Генерира се автоматично от текста при запис.")
     enabled = models.BooleanField(default=True, verbose_name="Активирано", help_text="Отбележете, за да активирате и покажете известието на сайта.")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Създадено на", help_text="Дата и час на създаване на известието. Формат: YYYY-MM-DD HH:MM:SS.")
 
+    markdown_fields = {'text': ('html_text', ['nl2br'])}
+
     def __str__(self):
         return self.text
 
@@ -279,12 +502,18 @@ class Notification(models.Model):
         verbose_name = "Известие"
         verbose_name_plural = "Известия"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['enabled', '-created_at'], name='notification_enabled_idx'),
+        ]
 
-class TermsOfService(models.Model):
+class TermsOfService(MarkdownRenderedModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=False, verbose_name="Автор", help_text="Авторът, който е създал/редактирал условията.")
     content = models.TextField(null=False, help_text="Пълният текст на Условията за ползване. Поддържа се Markdown.")
+    content_html = models.TextField(blank=True, default='', editable=False, help_text="HTML на условията. Генерира се автоматично при запис.")
     date = models.DateTimeField(auto_now_add=True, help_text="Дата на последната промяна. Формат: YYYY-MM-DD HH:MM:SS.")
 
+    markdown_fields = {'content': ('content_html', [])}
+
     def __str__(self):
         return f"{self.content} качено на : {self.user.username}"
 
@@ -292,11 +521,14 @@ class TermsOfService(models.Model):
         verbose_name = "Условие за ползване"
         verbose_name_plural = "Условия за ползване"
 
-class PrivacyPolicy(models.Model):
+class PrivacyPolicy(MarkdownRenderedModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=False, verbose_name="Автор", help_text="Авторът, който е създал/редактирал политиката.")
     content = models.TextField(null=False, help_text="Пълният текст на Политиката за поверителност. Поддържа се Markdown.")
+    content_html = models.TextField(blank=True, default='', editable=False, help_text="HTML на политиката. Генерира се автоматично при запис.")
     date = models.DateTimeField(auto_now_add=True, help_text="Дата на последната промяна. Формат: YYYY-MM-DD HH:MM:SS.")
 
+    markdown_fields = {'content': ('content_html', [])}
+
     def __str__(self):
         return f"{self.content} качено на : {self.user.username}"
 
@@ -304,9 +536,13 @@ class PrivacyPolicy(models.Model):
         verbose_name = "Политика за поверителност"
         verbose_name_plural = "Политики за поверителност"
 
-class PostImage(models.Model):
+class PostImage(ImageRenditionsModel):
     post = models.ForeignKey(Posts, related_name='images', on_delete=models.CASCADE, help_text="Публикацията, към която е свързана тази снимка.")
     image = models.ImageField(upload_to=post_gallery_upload_path, help_text="Файлът с изображението.")
+    image_renditions = models.JSONField(blank=True, default=dict, editable=False, help_text="Производни WebP/JPEG размери на изображението. Генерират се автоматично при качване.")
+    checksum = models.CharField(max_length=64, blank=True, default='', editable=False, help_text="SHA-256 на обработения файл.")
+
+    rendition_fields = {'image': 'image_renditions'}
 
     def __str__(self):
         return f"Image for post: {self.post.title}"
@@ -318,27 +554,191 @@ class PostImage(models.Model):
 class PostDocument(models.Model):
     post = models.ForeignKey(Posts, related_name='documents', on_delete=models.CASCADE, help_text="Публикацията, към която е свързан този документ.")
     file = models.FileField(upload_to=post_document_upload_path, help_text="Файлът с документа (PDF, DOCX, XLSX, ZIP).")
+    file_name = models.CharField(max_length=255, blank=True, default='', editable=False, verbose_name="Име на файла", help_text="Оригиналното име на качения файл.")
     uploaded_at = models.DateTimeField(auto_now_add=True, help_text="Дата и час на качване на документа. Формат: YYYY-MM-DD HH:MM:SS.")
+    checksum = models.CharField(max_length=64, blank=True, default='', editable=False, help_text="SHA-256 на файла.")
+    size = models.PositiveBigIntegerField(null=True, blank=True, editable=False, verbose_name="Размер", help_text="Размер на файла в байтове.")
+    content_type = models.CharField(max_length=100, blank=True, default='', editable=False, verbose_name="Тип на съдържанието")
 
     def __str__(self):
         return self.file.name
 
+    def save(self, *args, **kwargs):
+        # Името в хранилището може да не съвпада с оригиналното (напр. при ContentAddressedStorage)
+        if self.file and not self.file._committed:
+            self.file_name = posixpath.basename(self.file.name)
+        return super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Документ към публикация"
         verbose_name_plural = "Документи към публикации"
 
 
-class Event(models.Model):
+class PostSearchTerm(models.Model):
+    """
+    Portable full-text index of the posts (see search.py): one row per stemmed word of a post
+    with its weight (occurrences multiplied by the weight of the field it appears in).
+    """
+    post = models.ForeignKey(Posts, on_delete=models.CASCADE, related_name='search_terms', verbose_name="Публикация")
+    term = models.CharField(max_length=64, verbose_name="Дума", help_text="Нормализирана основа на думата.")
+    weight = models.PositiveIntegerField(default=1, verbose_name="Тегло")
+
+    class Meta:
+        verbose_name = "Дума от индекса за търсене"
+        verbose_name_plural = "Индекс за търсене"
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'term'], name='unique_post_search_term'),
+        ]
+        indexes = [
+            models.Index(fields=['term', 'post'], name='postsearchterm_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.weight})"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload of a post document or gallery image (see uploads.py).
+    Received bytes are appended to a part file in UPLOAD_SESSION_DIR; the file is attached to the post
+    only after the declared size and SHA-256 have been verified.
+    """
+    KIND_DOCUMENT = 'document'
+    KIND_IMAGE = 'image'
+    KIND_CHOICES = [
+        (KIND_DOCUMENT, 'Документ'),
+        (KIND_IMAGE, 'Изображение'),
+    ]
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Качва се'),
+        (STATUS_COMPLETE, 'Завършено'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions', verbose_name="Потребител")
+    post = models.ForeignKey(Posts, on_delete=models.CASCADE, related_name='upload_sessions', verbose_name="Публикация")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="Вид")
+    file_name = models.CharField(max_length=255, verbose_name="Име на файла")
+    size = models.PositiveBigIntegerField(verbose_name="Размер", help_text="Очакваният размер на файла в байтове.")
+    checksum = models.CharField(max_length=64, verbose_name="SHA-256", help_text="Очакваната контролна сума на целия файл.")
+    received = models.PositiveBigIntegerField(default=0, verbose_name="Получени байтове")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_OPEN, verbose_name="Статус")
+    object_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="Създаден запис", help_text="ID на документа или снимката след завършване.")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Започнато на")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Последна промяна")
+
+    class Meta:
+        verbose_name = "Качване на части"
+        verbose_name_plural = "Качвания на части"
+
+    def __str__(self):
+        return f"{self.file_name} ({self.received}/{self.size})"
+
+
+class StoredFile(models.Model):
+    """
+    Reference count of a file in ContentAddressedStorage (see storage.py).
+    """
+    name = models.CharField(max_length=255, unique=True, verbose_name="Път", help_text="Пътят на файла в хранилището.")
+    checksum = models.CharField(max_length=64, verbose_name="SHA-256")
+    size = models.PositiveBigIntegerField(verbose_name="Размер", help_text="Размер на файла в байтове.")
+    references = models.PositiveIntegerField(default=0, verbose_name="Брой използвания")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Създаден на")
+
+    class Meta:
+        verbose_name = "Съхранен файл"
+        verbose_name_plural = "Съхранени файлове"
+
+    def __str__(self):
+        return f"{self.name} ({self.references})"
+
+    @classmethod
+    def add_reference(cls, name, checksum, size):
+        """
+        Adds a reference to the file. The UPDATE/INSERT keeps the row locked until the surrounding transaction ends.
+        """
+        if cls.objects.filter(name=name).update(references=models.F('references') + 1):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, checksum=checksum, size=size, references=1)
+        except IntegrityError:
+            # Същият файл е записан едновременно от друга заявка
+            cls.objects.filter(name=name).update(references=models.F('references') + 1)
+
+    @classmethod
+    def release(cls, name):
+        """
+        Drops one reference and returns True if the file is no longer used and can be deleted.
+        Files without a record are not tracked and can always be deleted.
+        Call it in a transaction and delete the file before it ends, so a parallel add_reference waits for the row lock.
+        """
+        with transaction.atomic():
+            stored = cls.objects.select_for_update().filter(name=name).first()
+            if stored is None:
+                return True
+            if stored.references > 1:
+                stored.references -= 1
+                stored.save(update_fields=['references'])
+                return False
+            stored.delete()
+            return True
+
+
+class MediaJob(models.Model):
+    """
+    A unit of deferred media processing (see jobs.py).
+    Jobs are stored in the database and executed by the run_media_jobs worker outside the request.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Чака'),
+        (STATUS_RUNNING, 'Обработва се'),
+        (STATUS_DONE, 'Готово'),
+        (STATUS_FAILED, 'Грешка'),
+    ]
+
+    task = models.CharField(max_length=50, verbose_name="Задача", help_text="Името на задачата (виж blog/jobs.py).")
+    object_id = models.PositiveBigIntegerField(verbose_name="ID на обекта", help_text="Записът, който задачата обработва.")
+    post = models.ForeignKey(Posts, null=True, blank=True, on_delete=models.CASCADE, related_name='media_jobs', verbose_name="Публикация", help_text="Публикацията, към която е файлът.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Опити")
+    error = models.TextField(blank=True, default='', verbose_name="Грешка", help_text="Последната грешка при изпълнение.")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Създадена на")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Започната на")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завършена на")
+
+    class Meta:
+        verbose_name = "Обработка на файл"
+        verbose_name_plural = "Обработка на файлове"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='mediajob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.object_id} ({self.get_status_display()})"
+
+
+class Event(MarkdownRenderedModel):
     title = models.CharField(max_length=255, verbose_name="Заглавие", help_text="Име на събитието.")
     start_datetime = models.DateTimeField(verbose_name="Начална дата и час", help_text="Кога започва събитието. Формат: YYYY-MM-DD HH:MM:SS.")
     end_datetime = models.DateTimeField(blank=True, null=True, verbose_name="Крайна дата и час (по избор)", help_text="Кога приключва събитието (ако е приложимо). Формат: YYYY-MM-DD HH:MM:SS.")
     location = models.CharField(max_length=255, verbose_name="Местоположение", help_text="Къде ще се проведе събитието.")
     category = models.CharField(max_length=100, verbose_name="Категория", help_text="Тип на събитието (напр. 'Училищно', 'Спортно').")
     description = models.TextField(verbose_name="Описание", help_text="Подробно описание на събитието. Поддържа се Markdown.")
+    description_html = models.TextField(blank=True, default='', editable=False, verbose_name="Описание (HTML)", help_text="Генерира се автоматично от описанието при запис.")
     attendees_text = models.CharField(max_length=255, verbose_name="Участници (текст)", help_text="Кой може да присъства (напр. 'Всички ученици', '8-12 клас').")
     published = models.BooleanField(default=True, verbose_name="Публикувано", help_text="Отбележете, за да се показва събитието на сайта.")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Създадено на", help_text="Дата на създаване на записа за събитието. Формат: YYYY-MM-DD HH:MM:SS.")
 
+    markdown_fields = {'description': ('description_html', [])}
+
     def __str__(self):
         return self.title
 
@@ -346,14 +746,20 @@ class Event(models.Model):
         verbose_name = "Събитие"
         verbose_name_plural = "Събития"
         ordering = ['start_datetime']
+        indexes = [
+            models.Index(fields=['published', 'start_datetime'], name='event_published_start_idx'),
+        ]
 
 
-class Changelog(models.Model):
+class Changelog(MarkdownRenderedModel):
     content = models.TextField(help_text="Съдържание на промените в Markdown формат.")
+    content_html = models.TextField(blank=True, default='', editable=False, help_text="HTML на промените. Генерира се автоматично при запис.")
     created_at = models.DateTimeField(auto_now_add=True, help_text="Дата на създаване.")
     updated_at = models.DateTimeField(auto_now=True, help_text="Дата на последна редакция.")
     is_active = models.BooleanField(default=True, help_text="Отбележете, за да се вземе предвид този запис.")
 
+    markdown_fields = {'content': ('content_html', [])}
+
     class Meta:
         verbose_name = "Запис в дневника на промените"
         verbose_name_plural = "Дневник на промените"
@@ -363,6 +769,10 @@ class Changelog(models.Model):
         return f"Промени от {self.updated_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+# Колко секунди всеки процес пази настройките на сайта в паметта
+SITE_SETTINGS_CACHE_TTL = 30
+_site_settings_cache = (None, 0.0, None)
+
 class SiteSettings(models.Model):
     maintenance_mode = models.BooleanField(default=False, verbose_name="Режим на поддръжка", help_text="Ако е активиран, сайтът ще показва страница за поддръжка на всички потребители, които не са администратори.")
     enable_bell_suggestions = models.BooleanField(default=True, verbose_name="Активирани 'Предложения за песни'", help_text="Позволява на потребителите да предлагат песни за училищния звънец.")
@@ -378,4 +788,31 @@ class SiteSettings(models.Model):
     def save(self, *args, **kwargs):
         if not self.pk and SiteSettings.objects.exists():
             raise ValidationError('Може да съществува само един обект с настройки на сайта.')
-        return super(SiteSettings, self).save(*args, **kwargs)
+        result = super(SiteSettings, self).save(*args, **kwargs)
+        SiteSettings.clear_cache()
+        return result
+
+    @staticmethod
+    def clear_cache():
+        global _site_settings_cache
+        _site_settings_cache = (None, 0.0, None)
+
+    @classmethod
+    def load(cls):
+        """
+        Returns the site settings singleton, cached in process memory for SITE_SETTINGS_CACHE_TTL seconds.
+        The copy is stored with the shared cache version of SiteSettings (see cache.py), which every save/delete bumps,
+        so all processes reload right after a change; the TTL only covers writes that skip signals (QuerySet.update()).
+        """
+        global _site_settings_cache
+        obj, expires_at, cached_version = _site_settings_cache
+        # Версията се чете преди заявката, за да не се запомни стар обект с по-нова версия
+        version = get_model_versions(cls)[0]
+        if obj is not None and version == cached_version and time.monotonic() < expires_at:
+            return obj
+        obj, created = cls.objects.get_or_create(pk=1)
+        if created:
+            # Създаването сменя версията (post_save), а обектът вече е актуален
+            version = get_model_versions(cls)[0]
+        _site_settings_cache = (obj, time.monotonic() + SITE_SETTINGS_CACHE_TTL, version)
+        return obj
@@ -0,0 +1,31 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PostCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the posts feed.
+    Orders by (created_at, id), so the cost of a page does not depend on how deep in the archive it is.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+
+class CommentCursorPagination(CursorPagination):
+    """
+    Keyset pagination for comment threads, oldest first.
+    """
+    ordering = ('created_at', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Page number pagination for ranked search results, which cannot be paginated by a key.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
@@ -12,3 +12,15 @@ class IsOwner(permissions.BasePermission):
 
         # Write permissions are only allowed to the owner of the content.
         return obj.user == request.user
+
+
+class CanUploadPostFiles(permissions.BasePermission):
+    """
+    Staff members who may edit posts; an upload session can only be used by the user who started it.
+    """
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and user.is_staff and user.has_perm('blog.change_posts'))
+
+    def has_object_permission(self, request, view, obj):
+        return obj.user_id == request.user.id
@@ -0,0 +1,46 @@
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import PollQuestion
+
+ACTIVE_POLL_CACHE_KEY = 'blog:active-poll'
+_MISSING = object()
+
+
+class ActivePoll(NamedTuple):
+    question: PollQuestion  # с предварително заредени опции
+    correct_key: str | None
+    option_keys: dict  # id на опция -> ключ (a, b, c, d)
+
+
+def get_active_poll():
+    """
+    Returns an ActivePoll snapshot of the currently active question, or None if there is none.
+    The snapshot is cached until the question's end_date (or until the next question starts when
+    there is no active one) and is invalidated on any PollQuestion/PollOption change (see signals.py).
+    """
+    snapshot = cache.get(ACTIVE_POLL_CACHE_KEY, _MISSING)
+    if snapshot is not _MISSING:
+        if snapshot is None or snapshot.question.end_date >= timezone.now():
+            return snapshot
+
+    now = timezone.now()
+    question = PollQuestion.objects.filter(start_date__lte=now, end_date__gte=now).prefetch_related('options').first()
+    if question is None:
+        # end_date__gt ползва pollquestion_active_idx; бъдещите анкети и без това още не са приключили
+        next_question = PollQuestion.objects.filter(end_date__gt=now, start_date__gt=now).order_by('start_date').first()
+        timeout = (next_question.start_date - now).total_seconds() if next_question else None
+        cache.set(ACTIVE_POLL_CACHE_KEY, None, timeout)
+        return None
+
+    options = question.options.all()
+    correct_key = next((option.key for option in options if option.is_correct), None)
+    snapshot = ActivePoll(question, correct_key, {option.id: option.key for option in options})
+    cache.set(ACTIVE_POLL_CACHE_KEY, snapshot, (question.end_date - now).total_seconds())
+    return snapshot
+
+
+def invalidate_active_poll():
+    cache.delete(ACTIVE_POLL_CACHE_KEY)
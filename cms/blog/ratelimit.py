@@ -0,0 +1,103 @@
+import math
+import time
+
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+class RateLimit:
+    """
+    Sliding-window rate limit kept in the shared cache: at most `limit` events per `period` seconds per key.
+    No database queries are involved, so rejected attempts are cheap.
+
+    The window is split into BUCKETS counters (precision period / BUCKETS) that are updated with the atomic
+    cache.add() + cache.incr(), so parallel requests cannot all pass the limit.
+    check() tells how long the caller has to wait, hit() counts an event if it is allowed
+    and release() takes back an event that ended up not happening. The clock can be replaced in tests.
+    """
+    BUCKETS = 60
+
+    def __init__(self, scope, limit, period, clock=time.time):
+        self.scope = scope
+        self.limit = limit
+        self.period = period
+        self.clock = clock
+        self.granularity = period / self.BUCKETS
+
+    def cache_key(self, key, bucket):
+        return f'blog:ratelimit:{self.scope}:{key}:{bucket}'
+
+    def bucket(self, now):
+        return int(now // self.granularity)
+
+    def get_counts(self, key, now):
+        """
+        Returns [(bucket, count), ...] for the buckets of the current window, oldest first.
+        """
+        current = self.bucket(now)
+        buckets = range(current - self.BUCKETS + 1, current + 1)
+        counts = cache.get_many([self.cache_key(key, bucket) for bucket in buckets])
+        return [(bucket, counts.get(self.cache_key(key, bucket), 0)) for bucket in buckets]
+
+    def get_wait(self, counts, now):
+        total = sum(count for bucket, count in counts)
+        if total < self.limit:
+            return 0
+        # Изчакваме, докато от прозореца излязат толкова стари събития, че да остане място за още едно
+        for bucket, count in counts:
+            total -= count
+            if total < self.limit:
+                return max(1, math.ceil((bucket + self.BUCKETS) * self.granularity - now))
+        return math.ceil(self.period)
+
+    def check(self, key):
+        """
+        Returns the number of seconds until the next event is allowed, or 0 if it is allowed now.
+        """
+        now = self.clock()
+        return self.get_wait(self.get_counts(key, now), now)
+
+    def hit(self, key, now=None):
+        """
+        Counts an event and returns 0, or returns the wait in seconds without counting it when the limit is reached.
+        """
+        now = self.clock() if now is None else now
+        cache_key = self.cache_key(key, self.bucket(now))
+        cache.add(cache_key, 0, math.ceil(self.period + self.granularity))
+        count = cache.incr(cache_key)
+        counts = self.get_counts(key, now)
+        if sum(other for bucket, other in counts[:-1]) + count <= self.limit:
+            return 0
+        # Над лимита: връщаме броя обратно, отхвърленият опит не се брои
+        cache.decr(cache_key)
+        counts[-1] = (counts[-1][0], count - 1)
+        return self.get_wait(counts, now)
+
+    def release(self, key, now):
+        """
+        Takes back an event counted by hit(key, now).
+        """
+        try:
+            cache.decr(self.cache_key(key, self.bucket(now)))
+        except ValueError:
+            # Броячът вече е изтекъл
+            pass
+
+
+class RateLimitThrottle(BaseThrottle):
+    """
+    DRF throttle backed by RateLimit, keyed by user ID (or IP address for anonymous requests).
+    Subclasses set `rate_limit`; every request counts as an event.
+    """
+    rate_limit = None
+
+    def allow_request(self, request, view):
+        if request.user.is_authenticated:
+            key = f'user:{request.user.pk}'
+        else:
+            key = f'ip:{self.get_ident(request)}'
+        self.wait_time = self.rate_limit.hit(key)
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
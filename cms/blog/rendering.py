@@ -0,0 +1,154 @@
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+
+import markdown
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.utils.text import slugify
+
+# Позволените тагове и атрибути в HTML-а от Markdown; всичко останало се премахва
+ALLOWED_TAGS = frozenset((
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'dd', 'del', 'div', 'dl', 'dt', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'ins', 'kbd', 'li', 'mark', 'ol', 'p', 'pre', 's', 'small',
+    'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+))
+ALLOWED_ATTRIBUTES = {
+    '*': frozenset(('title',)),
+    'a': frozenset(('href',)),
+    'img': frozenset(('src', 'alt', 'width', 'height')),
+    'ol': frozenset(('start',)),
+    'td': frozenset(('colspan', 'rowspan')),
+    'th': frozenset(('colspan', 'rowspan')),
+}
+# Непозволени тагове, които се изтриват заедно със съдържанието си (останалите се заменят с текста си)
+DROPPED_CONTENT_TAGS = ('script', 'style', 'iframe', 'object', 'embed', 'form', 'svg', 'math', 'template', 'noscript', 'textarea', 'select', 'title')
+URL_ATTRIBUTES = ('href', 'src')
+ALLOWED_URL_SCHEMES = ('http', 'https', 'mailto', 'tel')
+URL_SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.-]*):')
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+# Средна скорост на четене (думи в минута), по която се изчислява времето за четене
+WORDS_PER_MINUTE = 200
+
+
+def is_safe_url(value):
+    # Браузърите пренебрегват интервали и управляващи символи в схемата (java\tscript:)
+    compact = ''.join(char for char in value if char > ' ').lower()
+    match = URL_SCHEME_RE.match(compact)
+    return match is None or match.group(1) in ALLOWED_URL_SCHEMES
+
+
+def sanitize_html(html):
+    """
+    Keeps only allowlisted tags and attributes of rendered Markdown; href/src must be relative
+    or use an allowed scheme (http, https, mailto, tel).
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup.find_all(DROPPED_CONTENT_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        if tag.name not in ALLOWED_TAGS:
+            tag.unwrap()
+            continue
+        allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag.name, frozenset())
+        for attribute in list(tag.attrs):
+            value = tag.attrs[attribute]
+            if attribute not in allowed or not isinstance(value, str):
+                del tag.attrs[attribute]
+            elif attribute in URL_ATTRIBUTES and not is_safe_url(value):
+                del tag.attrs[attribute]
+    return str(soup)
+
+
+class MarkdownRenderer:
+    """
+    Shared Markdown rendering service.
+
+    Configured markdown.Markdown instances are built once per thread and extension set and reset between uses,
+    and the sanitized output is kept in a bounded LRU keyed by the SHA-256 of the text and extensions.
+    `hits` and `misses` count cache lookups.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def get_instance(self, extensions):
+        instances = getattr(self._local, 'instances', None)
+        if instances is None:
+            instances = self._local.instances = {}
+        if extensions not in instances:
+            instances[extensions] = markdown.Markdown(extensions=list(extensions))
+        return instances[extensions].reset()
+
+    def render(self, text, extensions=()):
+        if not text:
+            return ''
+        extensions = tuple(extensions)
+        key = hashlib.sha256('\0'.join((*extensions, text)).encode('utf-8')).hexdigest()
+
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = sanitize_html(self.get_instance(extensions).convert(text))
+
+        with self._lock:
+            self._cache[key] = html
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return html
+
+    def cache_info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+
+renderer = MarkdownRenderer(maxsize=settings.MARKDOWN_CACHE_SIZE)
+
+
+def render_markdown(text, extensions=()):
+    """
+    Renders Markdown to sanitized HTML through the shared renderer.
+    """
+    return renderer.render(text, extensions)
+
+
+def render_document(text, extensions=()):
+    """
+    Renders a long Markdown document and extracts its metadata.
+    Headings get unique ids for in-page links; returns (html, outline, word_count, reading_time),
+    where the outline is a list of {'level', 'title', 'id'} and reading_time is in whole minutes.
+    """
+    soup = BeautifulSoup(render_markdown(text, extensions), 'html.parser')
+    outline = []
+    used_ids = set()
+    for heading in soup.find_all(HEADING_TAGS):
+        title = heading.get_text(' ', strip=True)
+        base_id = slugify(title, allow_unicode=True) or 'section'
+        heading_id = base_id
+        suffix = 1
+        while heading_id in used_ids:
+            suffix += 1
+            heading_id = f'{base_id}-{suffix}'
+        used_ids.add(heading_id)
+        heading['id'] = heading_id
+        outline.append({'level': int(heading.name[1]), 'title': title, 'id': heading_id})
+
+    word_count = len(soup.get_text(' ').split())
+    reading_time = math.ceil(word_count / WORDS_PER_MINUTE) if word_count else 0
+    return str(soup), outline, word_count, reading_time
@@ -0,0 +1,133 @@
+import re
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.expressions import RawSQL
+
+from .models import Posts, PostSearchTerm
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Тегла на полетата при класирането: съвпадение в заглавието тежи повече от такова в текста
+FIELD_WEIGHTS = (('title', 5), ('hook', 2), ('content', 1))
+
+# Най-честите служебни думи, които не носят смисъл при търсене
+STOP_WORDS = frozenset((
+    'и', 'в', 'във', 'на', 'за', 'с', 'със', 'от', 'да', 'се', 'си', 'по', 'че', 'е', 'са', 'не', 'ще', 'до', 'при',
+    'как', 'а', 'или', 'но', 'то', 'ли', 'като', 'към', 'без', 'след', 'през', 'който', 'която', 'което', 'които',
+))
+
+# Окончания за леко стемиране на български: членове, множествено число и прилагателни.
+# Премахва се най-дългото съвпадащо окончание, ако остават поне MIN_STEM_LENGTH букви;
+# това се прави два пъти, за да падне и членът, и окончанието (училището -> училище -> училищ).
+SUFFIXES = sorted((
+    'овете', 'евете', 'ията', 'ието', 'ият', 'ия', 'ове', 'еве', 'ите', 'ата', 'ото',
+    'ния', 'ната', 'ното', 'ните', 'ът', 'ят', 'та', 'то', 'те', 'ен', 'на', 'но', 'ни', 'а', 'я', 'о', 'е', 'и', 'ъ', 'й',
+), key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+MAX_TERM_LENGTH = 64
+
+
+def normalize(text):
+    """
+    Lowercases the text, drops accents (ѝ -> и, стре́ла -> стрела) and unifies ё/э with е.
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return unicodedata.normalize('NFC', text).replace('ё', 'е').replace('э', 'е')
+
+
+def strip_suffix(token):
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+
+def stem(token):
+    return strip_suffix(strip_suffix(token))
+
+
+def tokenize(text):
+    """
+    Returns the stems of the meaningful words in the text.
+    """
+    return [
+        stem(token)[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(normalize(text or ''))
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def post_terms(post):
+    """
+    Returns {term: weight} for a post; the weight is the number of occurrences multiplied by the field weight.
+    """
+    weights = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(getattr(post, field)):
+            weights[term] += weight
+    return weights
+
+
+def index_posts(posts):
+    """
+    Replaces the index terms of the given posts in the portable search index.
+    """
+    with transaction.atomic():
+        PostSearchTerm.objects.filter(post__in=[post.pk for post in posts]).delete()
+        PostSearchTerm.objects.bulk_create(
+            [
+                PostSearchTerm(post=post, term=term, weight=weight)
+                for post in posts
+                for term, weight in post_terms(post).items()
+            ],
+            batch_size=500,
+        )
+
+
+def index_post(post):
+    index_posts([post])
+
+
+def reindex_post(post_id):
+    """
+    Indexes the current text of a post; called after the transaction that changed it commits.
+    A post deleted in the meantime is skipped (its terms go away with it through the foreign key).
+    """
+    post = Posts.objects.only(*Posts.search_fields).filter(pk=post_id).first()
+    if post is not None:
+        index_post(post)
+
+
+def get_backend():
+    if settings.SEARCH_BACKEND == 'auto':
+        return 'mysql' if connection.vendor == 'mysql' else 'index'
+    return settings.SEARCH_BACKEND
+
+
+def search_posts(queryset, query):
+    """
+    Filters the posts queryset by the query and orders it by relevance (newer posts first on ties).
+
+    The MySQL backend uses the FULLTEXT index on title/hook/content in boolean mode with a prefix search for every stem,
+    so inflected forms match. The portable backend matches stems in the PostSearchTerm table and ranks
+    by the number of matched query terms, then by their summed weight.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return queryset.none()
+
+    if get_backend() == 'mysql':
+        expression = ' '.join(f'{term}*' for term in terms)
+        return queryset.annotate(
+            search_rank=RawSQL('MATCH(blog_posts.title, blog_posts.hook, blog_posts.content) AGAINST (%s IN BOOLEAN MODE)', [expression])
+        ).filter(search_rank__gt=0).order_by('-search_rank', '-created_at', '-id')
+
+    return queryset.filter(search_terms__term__in=terms).annotate(
+        search_matched=Count('search_terms'),
+        search_rank=Sum('search_terms__weight'),
+    ).order_by('-search_matched', '-search_rank', '-created_at', '-id')
@@ -1,13 +1,16 @@
 from rest_framework import serializers
 from .models import Posts, UserProfile, Comments, PollQuestion, PollAnswer, PollOption, ContactSubmission, Notification, \
-    Event, TermsOfService, PostImage, BellSongSuggestion, PrivacyPolicy, MemeOfWeek, Cookie, SiteSettings, PostDocument, Changelog
+    Event, TermsOfService, PostImage, BellSongSuggestion, PrivacyPolicy, MemeOfWeek, Cookie, SiteSettings, PostDocument, Changelog, PollScore, UploadSession
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from .images import rendition_urls
+from .forms import allowed_document_extensions
+from django.conf import settings
+from django.urls import reverse
 import requests
 from bs4 import BeautifulSoup
+import posixpath
 import re
-import markdown # New import
-from django.utils.safestring import mark_safe # New import
 
 class PostImageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -23,11 +26,14 @@ class PostDocumentSerializer(serializers.ModelSerializer):
         fields = ['id', 'file_name', 'file_url', 'uploaded_at']
 
     def get_file_url(self, obj):
-        if obj.file and hasattr(obj.file, 'url'):
-            return obj.file.url
+        # Документите се изтеглят през DocumentDownloadView, който проверява видимостта на публикацията
+        if obj.file:
+            return reverse('document-download', args=[obj.pk])
         return None
 
     def get_file_name(self, obj):
+        if obj.file_name:
+            return obj.file_name
         if obj.file and hasattr(obj.file, 'name'):
             return obj.file.name.split('/')[-1]
         return None
@@ -38,6 +44,8 @@ class PostSerializer(serializers.ModelSerializer):
     images = serializers.SerializerMethodField()
     documents = serializers.SerializerMethodField()
     banner = serializers.SerializerMethodField()
+    banner_srcset = serializers.SerializerMethodField()
+    images_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Posts
@@ -49,15 +57,31 @@ class PostSerializer(serializers.ModelSerializer):
             'author_username',# ⬅️ Добавено: Потребителско име
             'title',
             'banner',
+            'banner_srcset',
             'hook',
             'content',
+            'content_html',
+            'content_outline',
+            'word_count',
+            'reading_time',
             'created_at',
             'published',
             'allowed',
             'images',
+            'images_srcset',
             'documents' # Add documents here
         )
 
+    def get_fields(self):
+        # ?body=html връща готовия HTML вместо Markdown-а, за да не се парсва на клиента
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and request.query_params.get('body') == 'html':
+            fields.pop('content', None)
+        else:
+            fields.pop('content_html', None)
+        return fields
+
     def get_banner(self, obj):
         if obj.banner and hasattr(obj.banner, 'url'):
             return obj.banner.url
@@ -67,13 +91,45 @@ class PostSerializer(serializers.ModelSerializer):
         return obj.author.username
 
     def get_images(self, obj):
+        # Като документите - през PostImageDownloadView, който проверява видимостта на публикацията
+        images = obj.images.all()
+        return [reverse('post-image-download', args=[image.pk]) for image in images if image.image]
+
+    def get_banner_srcset(self, obj):
+        return rendition_urls(obj.banner, obj.banner_renditions)
+
+    def get_images_srcset(self, obj):
+        # В същия ред като images
         images = obj.images.all()
-        return [image.image.url for image in images if image.image]
+        return [rendition_urls(image.image, image.image_renditions) for image in images if image.image]
 
     def get_documents(self, obj):
-        request = self.context.get('request')
         documents = obj.documents.all()
-        return [PostDocumentSerializer(doc, context={'request': request}).data for doc in documents]
+        return PostDocumentSerializer(documents, many=True, context=self.context).data
+
+class PostListSerializer(PostSerializer):
+    """
+    Slim representation for the posts feed.
+    Drops content and documents; the full payload is served by PostSerializer on retrieve.
+    """
+    class Meta(PostSerializer.Meta):
+        fields = (
+            'id',
+            'category',
+            'category_name',
+            'author',
+            'author_username',
+            'title',
+            'banner',
+            'banner_srcset',
+            'hook',
+            'reading_time',
+            'created_at',
+            'published',
+            'allowed',
+            'images',
+            'images_srcset',
+        )
 
 class RegisterSerializer(serializers.ModelSerializer):
     # Поле за парола (само за писане и с валидация)
@@ -179,7 +235,7 @@ class UsernameChangeSerializer(serializers.Serializer):
 
 class CommentSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
-    post_id = serializers.IntegerField(source='post.id', read_only=True)
+    post_id = serializers.IntegerField(read_only=True)
     parent_id = serializers.PrimaryKeyRelatedField(source='parent', read_only=True)
     parent_username = serializers.SerializerMethodField()
     reply_count = serializers.SerializerMethodField()
@@ -193,14 +249,17 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'username', 'post_id', 'parent_id', 'parent_username', 'reply_count']
 
     def get_parent_username(self, obj):
-        if obj.parent:
+        if obj.parent_id:
             return obj.parent.user.username
         return None
 
     def get_reply_count(self, obj):
-        if obj.parent is None:
-            return obj.replies.count()
-        return 0
+        if obj.parent_id is not None:
+            return 0
+        # Списъчните изгледи анотират броя на отговорите (виж comment_queryset във views.py)
+        if hasattr(obj, 'reply_count'):
+            return obj.reply_count
+        return obj.replies.count()
 
     def create(self, validated_data):
         parent = validated_data.get('parent')
@@ -211,36 +270,52 @@ class CommentSerializer(serializers.ModelSerializer):
 
 
 
+class CommentThreadSerializer(CommentSerializer):
+    replies = CommentSerializer(source='reply_preview', many=True, read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['replies']
+        read_only_fields = CommentSerializer.Meta.read_only_fields + ['replies']
+
+
 class PollOptionSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = PollOption
-        fields = ['id', 'key', 'text', 'image_url']
+        fields = ['id', 'key', 'text', 'image_url', 'image_srcset']
 
     def get_image_url(self, obj):
         if obj.image and hasattr(obj.image, 'url'):
             return obj.image.url
         return None
 
+    def get_image_srcset(self, obj):
+        return rendition_urls(obj.image, obj.image_renditions)
+
 class PollQuestionSerializer(serializers.ModelSerializer):
     options = PollOptionSerializer(many=True, read_only=True)
     id = serializers.IntegerField(read_only=False)
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = PollQuestion
-        fields = ['id', 'title', 'subtitle', 'task_description', 'image_url', 'options']
+        fields = ['id', 'title', 'subtitle', 'task_description', 'image_url', 'image_srcset', 'options']
 
     def get_image_url(self, obj):
         if obj.image and hasattr(obj.image, 'url'):
             return obj.image.url
         return None
 
-class PollAnswerSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = PollAnswer
-        fields = ['question', 'selected_option']
+    def get_image_srcset(self, obj):
+        return rendition_urls(obj.image, obj.image_renditions)
+
+class PollAnswerSerializer(serializers.Serializer):
+    # Само ID-та: въпросът и опцията се проверяват спрямо кеширания активен въпрос (виж polls.py)
+    question = serializers.IntegerField()
+    selected_option = serializers.IntegerField()
 
 
 class UserPollStatusSerializer(serializers.Serializer):
@@ -251,18 +326,20 @@ class UserPollStatusSerializer(serializers.Serializer):
 
 
 class LeaderboardEntrySerializer(serializers.ModelSerializer):
-    correct_answers = serializers.IntegerField()
+    id = serializers.IntegerField(source='user_id')
+    username = serializers.CharField(source='user.username')
 
     class Meta:
-        model = User
+        model = PollScore
         fields = ['id', 'username', 'correct_answers']
 
 
 class RecentParticipantSerializer(serializers.ModelSerializer):
-    last_answered = serializers.DateTimeField()
+    id = serializers.IntegerField(source='user_id')
+    username = serializers.CharField(source='user.username')
 
     class Meta:
-        model = User
+        model = PollScore
         fields = ['id', 'username', 'last_answered']
 
 
@@ -278,15 +355,11 @@ class ContactSubmissionSerializer(serializers.ModelSerializer):
 
 
 class NotificationSerializer(serializers.ModelSerializer):
-    html_text = serializers.SerializerMethodField()
     class Meta:
         model = Notification
         fields = ['id', 'text', 'enabled', 'created_at', 'html_text']
         read_only_fields = ['html_text']
 
-    def get_html_text(self, obj):
-        return mark_safe(markdown.markdown(obj.text, extensions=['nl2br']))
-
 
 class EventSerializer(serializers.ModelSerializer):
     class Meta:
@@ -297,18 +370,18 @@ class EventSerializer(serializers.ModelSerializer):
 class ChangelogSerializer(serializers.ModelSerializer):
     class Meta:
         model = Changelog
-        fields = ['content', 'updated_at']
+        fields = ['content', 'content_html', 'updated_at']
 
 
 class TermsOfServiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = TermsOfService
-        fields = ['content', 'date']
+        fields = ['content', 'content_html', 'date']
 
 class PrivacyPolicySerializer(serializers.ModelSerializer):
     class Meta:
         model = PrivacyPolicy
-        fields = ['content', 'date']
+        fields = ['content', 'content_html', 'date']
 
 
 class BellSongSuggestionSerializer(serializers.ModelSerializer):
@@ -322,6 +395,9 @@ class BellSongSuggestionSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'status', 'submitted_at', 'votes', 'user_username', 'has_voted']
 
     def get_has_voted(self, obj):
+        # Списъчните изгледи подават гласовете на потребителя наведнъж (виж VotedIdsMixin)
+        if 'voted_ids' in self.context:
+            return obj.id in self.context['voted_ids']
         user = self.context['request'].user
         if user.is_authenticated:
             return obj.voted_by.filter(id=user.id).exists()
@@ -342,12 +418,13 @@ class BellSongSuggestionSerializer(serializers.ModelSerializer):
 class MemeOfWeekSerializer(serializers.ModelSerializer):
     user_username = serializers.CharField(source='user.username', read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     has_voted = serializers.SerializerMethodField()
 
     class Meta:
         model = MemeOfWeek
-        fields = ['id', 'title', 'image', 'image_url', 'user_username', 'created_at', 'is_approved', 'votes', 'has_voted']
-        read_only_fields = ['id', 'user_username', 'created_at', 'image_url', 'is_approved', 'votes', 'has_voted']
+        fields = ['id', 'title', 'image', 'image_url', 'image_srcset', 'user_username', 'created_at', 'is_approved', 'votes', 'has_voted']
+        read_only_fields = ['id', 'user_username', 'created_at', 'image_url', 'image_srcset', 'is_approved', 'votes', 'has_voted']
         # 'image' is write-only, the URL is for reading
         extra_kwargs = {
             'image': {'write_only': True, 'required': True},
@@ -359,7 +436,13 @@ class MemeOfWeekSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def get_image_srcset(self, obj):
+        return rendition_urls(obj.image, obj.image_renditions)
+
     def get_has_voted(self, obj):
+        # Списъчните изгледи подават гласовете на потребителя наведнъж (виж VotedIdsMixin)
+        if 'voted_ids' in self.context:
+            return obj.id in self.context['voted_ids']
         user = self.context['request'].user
         if user.is_authenticated:
             return obj.voted_by.filter(id=user.id).exists()
@@ -375,3 +458,46 @@ class SiteSettingsSerializer(serializers.ModelSerializer):
     class Meta:
         model = SiteSettings
         fields = ['maintenance_mode', 'enable_bell_suggestions', 'enable_weekly_poll', 'enable_meme_of_the_week', 'enable_user_registration', 'enable_program_page']
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'post', 'kind', 'file_name', 'size', 'checksum', 'offset', 'chunk_size', 'status', 'object_id', 'created_at']
+        read_only_fields = ['id', 'status', 'object_id', 'created_at']
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_CHUNK_SIZE
+
+    def validate_post(self, value):
+        user = self.context['request'].user
+        if value.author_id != user.id and not user.has_perm('blog.can_edit_users_post'):
+            raise serializers.ValidationError("Нямате право да качвате файлове към тази публикация.")
+        return value
+
+    def validate_file_name(self, value):
+        # Пазим само името: части от път (и от Windows) не бива да стигат до upload_to
+        value = posixpath.basename(value.replace('\\', '/')).strip()
+        if value in ('', '.', '..'):
+            raise serializers.ValidationError("Невалидно име на файл.")
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Размерът трябва да е между 1 и {settings.UPLOAD_MAX_SIZE} байта.")
+        return value
+
+    def validate_checksum(self, value):
+        value = value.lower()
+        if not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError("Очаква се SHA-256 в шестнайсетичен вид.")
+        return value
+
+    def validate(self, data):
+        extension = data['file_name'].rsplit('.', 1)[-1].lower() if '.' in data['file_name'] else ''
+        if data['kind'] == UploadSession.KIND_DOCUMENT and extension not in allowed_document_extensions:
+            raise serializers.ValidationError({'file_name': f"Позволени формати: {', '.join(allowed_document_extensions)}."})
+        return data
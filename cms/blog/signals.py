@@ -0,0 +1,112 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import FileField
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from .cache import bump_model_version
+from .images import delete_renditions
+from .polls import invalidate_active_poll
+from .search import get_backend, reindex_post
+from .storage import ContentAddressedStorage
+from .models import Posts, PostImage, PostDocument, Category, Event, Notification, Changelog, TermsOfService, PrivacyPolicy, BellSongSuggestion, SiteSettings, PollQuestion, PollOption, MemeOfWeek, StoredFile
+
+# Моделите, чиито данни участват в кешираните отговори и ETag-овете на API-то (виж cache.py)
+CACHED_MODELS = (
+    Posts, PostImage, PostDocument, Category, Event, Notification, Changelog, TermsOfService, PrivacyPolicy, BellSongSuggestion, SiteSettings,
+)
+
+
+def invalidate_api_cache(sender, **kwargs):
+    # Версията се сменя след транзакцията: иначе паралелна заявка би кеширала старите редове под новата версия
+    transaction.on_commit(partial(bump_model_version, sender))
+
+
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_api_cache, sender=model, dispatch_uid=f'invalidate_api_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_api_cache, sender=model, dispatch_uid=f'invalidate_api_cache_delete_{model.__name__}')
+
+
+def invalidate_poll_cache(sender, **kwargs):
+    invalidate_active_poll()
+
+
+for model in (PollQuestion, PollOption):
+    post_save.connect(invalidate_poll_cache, sender=model, dispatch_uid=f'invalidate_poll_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_poll_cache, sender=model, dispatch_uid=f'invalidate_poll_cache_delete_{model.__name__}')
+
+
+def delete_image_renditions(sender, instance, **kwargs):
+    # Оригиналният файл се трие от django_cleanup; производните размери - тук, след успешна транзакция
+    for source, target in sender.rendition_fields.items():
+        renditions = getattr(instance, target)
+        if renditions:
+            transaction.on_commit(partial(delete_renditions, sender._meta.get_field(source).storage, renditions))
+
+
+for model in (Posts, PostImage, MemeOfWeek, PollQuestion, PollOption):
+    post_delete.connect(delete_image_renditions, sender=model, dispatch_uid=f'delete_image_renditions_{model.__name__}')
+
+
+def remember_replaced_files(sender, instance, raw=False, **kwargs):
+    """
+    Stores the current names of content-addressed files that are being replaced in this save.
+    Only runs a query when a new file was uploaded to an existing row.
+    """
+    instance._replaced_files = {}
+    if raw or instance.pk is None:
+        return
+    saved = getattr(instance, '_saved_file_fields', set())
+    fields = [
+        field.name for field in sender._meta.fields
+        if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+        and (field.name in saved or not getattr(instance, field.name)._committed)
+    ]
+    if fields:
+        old_names = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+        if old_names:
+            instance._replaced_files = dict(zip(fields, old_names))
+
+
+def release_reuploaded_files(sender, instance, raw=False, **kwargs):
+    # Същото съдържание, качено отново в същото поле, получава същото име: django_cleanup не вика delete(),
+    # а _save() вече е добавил препратка, затова я махаме тук
+    replaced = instance.__dict__.pop('_replaced_files', {})
+    instance.__dict__.pop('_saved_file_fields', None)
+    for field, old_name in replaced.items():
+        if old_name and old_name == getattr(instance, field).name:
+            StoredFile.release(old_name)
+
+
+for model in (Posts, PostImage, PostDocument, MemeOfWeek, PollQuestion, PollOption):
+    pre_save.connect(remember_replaced_files, sender=model, dispatch_uid=f'remember_replaced_files_{model.__name__}')
+    post_save.connect(release_reuploaded_files, sender=model, dispatch_uid=f'release_reuploaded_files_{model.__name__}')
+
+
+def update_search_index(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """
+    Reindexes a post after the transaction commits, but only when its title, hook or content changed.
+    Publishing or approving a post needs no reindexing: search filters by published/allowed on every query
+    and the cached responses are dropped through CACHED_MODELS. Deleted posts lose their terms through the foreign key.
+    """
+    # На MySQL търсенето използва FULLTEXT индекса, който базата поддържа сама
+    if raw or get_backend() != 'index':
+        return
+    if update_fields is not None and not set(update_fields) & set(Posts.search_fields):
+        return
+    source = instance.get_search_source()
+    if not created and source == getattr(instance, '_search_source', None):
+        return
+    transaction.on_commit(partial(reindex_saved_post, instance, source), robust=True)
+
+
+def reindex_saved_post(instance, source):
+    # Текстът се запомня едва след успешна транзакция; при rollback следващият запис индексира наново.
+    # robust=True: грешка при индексирането не проваля вече записаната публикация (rebuild_search_index я поправя)
+    instance._search_source = source
+    reindex_post(instance.pk)
+    # Резултатите от търсенето, кеширани между записа и преиндексирането, се изчистват отново
+    bump_model_version(Posts)
+
+
+post_save.connect(update_search_index, sender=Posts, dispatch_uid='update_search_index')
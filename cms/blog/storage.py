@@ -0,0 +1,50 @@
+import hashlib
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names every file after the SHA-256 of its content
+    (cas/ab/cd/<sha256>.<ext>), so identical uploads are stored once.
+
+    References are counted in StoredFile: saving an existing content adds a reference,
+    delete() removes one and deletes the file only when nothing refers to it any more.
+    Files outside the content-addressed tree (uploaded before switching to this storage) are deleted as usual.
+    """
+    prefix = 'cas'
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        checksum = digest.hexdigest()
+        extension = posixpath.splitext(name)[1].lower()
+        return checksum, posixpath.join(self.prefix, checksum[:2], checksum[2:4], checksum + extension)
+
+    def _save(self, name, content):
+        from .models import StoredFile
+
+        checksum, target = self.content_name(name, content)
+        # Първо се взима препратката: редът на StoredFile остава заключен до края на транзакцията,
+        # така че паралелно delete() не може да изтрие файла между проверката и записа
+        with transaction.atomic():
+            StoredFile.add_reference(target, checksum, content.size)
+            if not self.exists(target):
+                saved = super()._save(target, content)
+                if saved != target:
+                    # Друг процес е записал същото съдържание междувременно; пазим само едното копие
+                    super().delete(saved)
+        return target
+
+    def delete(self, name):
+        from .models import StoredFile
+
+        if not name:
+            return
+        # Файлът се трие, докато редът е заключен от release()
+        with transaction.atomic():
+            if StoredFile.release(name):
+                super().delete(name)
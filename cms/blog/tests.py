@@ -1,3 +1,1611 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import quote
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction, IntegrityError
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from PIL import Image
+
+from . import jobs, search, signals, views, votes
+from .cache import bump_model_version, get_model_versions
+from .ratelimit import RateLimit, RateLimitThrottle
+from .pagination import PostCursorPagination
+from .rendering import MarkdownRenderer, sanitize_html
+from .serializer import PostListSerializer
+from .models import Category, Posts, PostImage, PostDocument, Event, SiteSettings, BellSongSuggestion, MemeOfWeek, PollQuestion, PollOption, PollAnswer, PollScore, Comments, Notification, Changelog, TermsOfService, MediaJob, StoredFile, PostSearchTerm, PendingVote
+
+
+def image_file(name, size=(1, 1), image_format='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def create_post(author, category, **kwargs):
+    defaults = {
+        'title': 'Публикация',
+        'hook': 'Кукичка',
+        'content': 'Съдържание',
+        'published': True,
+        'allowed': True,
+    }
+    defaults.update(kwargs)
+    return Posts.objects.create(author=author, category=category, **defaults)
+
+
+class APITestMixin:
+    """Fresh cache, reloaded site settings and a new API client for every test."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        SiteSettings.clear_cache()
+        self.client = APIClient()
+
+
+class TempMediaMixin:
+    """Points the settings in temp_dir_settings at temporary directories removed after the class."""
+
+    temp_dir_settings = ('MEDIA_ROOT',)
+
+    @classmethod
+    def setUpClass(cls):
+        directories = {}
+        for name in cls.temp_dir_settings:
+            directories[name] = tempfile.mkdtemp()
+            cls.addClassCleanup(shutil.rmtree, directories[name], ignore_errors=True)
+        # Преди super(), за да важи и за файловете от setUpTestData
+        overridden = override_settings(**directories)
+        overridden.enable()
+        cls.addClassCleanup(overridden.disable)
+        super().setUpClass()
+
+
+class PostViewSetQueryCountTests(TempMediaMixin, APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.authors = [User.objects.create(username=f'author{i}') for i in range(3)]
+
+    def setUp(self):
+        super().setUp()
+        # Флаговете на сайта се кешират в паметта на процеса, зареждаме ги извън броенето на заявки
+        SiteSettings.load()
+
+    def _add_posts(self, count):
+        posts = []
+        for i in range(count):
+            post = create_post(self.authors[i % len(self.authors)], self.category, title=f'Публикация {i}')
+            PostImage.objects.create(post=post, image=image_file(f'img{i}.png'))
+            PostDocument.objects.create(post=post, file=SimpleUploadedFile(f'doc{i}.pdf', b'pdf'))
+            posts.append(post)
+        return posts
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        self._add_posts(30)
+
+        # Posts (joined with author and category) + prefetched images
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/posts/', {'page_size': 5})
+        self.assertEqual(len(response.json()['results']), 5)
+
+        with self.assertNumQueries(2) as queries:
+            response = self.client.get('/api/posts/', {'page_size': 30})
+        self.assertEqual(len(response.json()['results']), 30)
+
+        # Текстът на публикациите не се чете за списъка
+        posts_sql = queries.captured_queries[0]['sql']
+        self.assertIn(connection.ops.quote_name('hook'), posts_sql)
+        for column in ('content', 'content_html', 'content_outline'):
+            self.assertNotIn(connection.ops.quote_name(column), posts_sql)
+
+    def test_detail_query_count(self):
+        post = self._add_posts(1)[0]
+        PostImage.objects.create(post=post, image=image_file('extra.png'))
+
+        # Post (joined with author and category) + prefetched images + prefetched documents
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/posts/{post.pk}/')
+        data = response.json()
+        self.assertEqual(data['author_username'], post.author.username)
+        self.assertEqual(data['category_name'], self.category.full_name)
+        self.assertEqual(len(data['images']), 2)
+        self.assertEqual(len(data['documents']), 1)
+
+
+class PostFeedPaginationTests(APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(full_name='Новини', short_name='novini')
+        author = User.objects.create(username='author')
+        created_at = timezone.now()
+        # Повечето публикации са със същото време, за да се провери подреждането по id при равенство
+        Posts.objects.bulk_create([
+            Posts(
+                title=f'Публикация {i}', category=category, author=author, hook='Кукичка', content='Съдържание',
+                published=True, allowed=True, created_at=created_at - timedelta(hours=i // 40),
+            )
+            for i in range(55)
+        ])
+        cls.expected = list(Posts.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def test_next_cursor_walks_the_whole_feed(self):
+        seen = []
+        url = '/api/posts/?page_size=7'
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(seen, self.expected)
+
+    def test_page_size_is_capped(self):
+        data = self.client.get('/api/posts/', {'page_size': 1000}).json()
+        self.assertEqual(len(data['results']), PostCursorPagination.max_page_size)
+
+    def test_list_items_use_the_slim_serializer(self):
+        item = self.client.get('/api/posts/').json()['results'][0]
+        self.assertEqual(set(item), set(PostListSerializer.Meta.fields))
+        self.assertNotIn('content', item)
+
+
+class AnonymousResponseCacheTests(TempMediaMixin, APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.author = User.objects.create(username='author')
+
+    def test_repeated_anonymous_request_is_served_from_cache(self):
+        create_post(self.author, self.category)
+        self.client.get('/api/posts/')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/posts/')
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_query_string_is_part_of_the_key(self):
+        create_post(self.author, self.category)
+        create_post(self.author, self.category)
+        self.client.get('/api/posts/', {'page_size': 1})
+
+        response = self.client.get('/api/posts/', {'page_size': 2})
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_version_changes_only_after_commit(self):
+        post = create_post(self.author, self.category)
+        version = get_model_versions(Posts)
+        self.client.get('/api/posts/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.title = 'Ново заглавие'
+            post.save()
+            # Заявка преди края на транзакцията вижда старите данни и не бива да ги кешира под нова версия
+            self.assertEqual(get_model_versions(Posts), version)
+        self.assertNotEqual(get_model_versions(Posts), version)
+        self.assertEqual(self.client.get('/api/posts/').json()['results'][0]['title'], 'Ново заглавие')
+
+    def test_saving_a_post_invalidates_the_feed(self):
+        post = create_post(self.author, self.category)
+        self.client.get('/api/posts/')
+
+        post.title = 'Ново заглавие'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response.json()['results'][0]['title'], 'Ново заглавие')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response.json()['results'], [])
+
+    def test_other_models_do_not_invalidate_the_feed(self):
+        create_post(self.author, self.category)
+        self.client.get('/api/posts/')
+
+        Event.objects.create(
+            title='Събитие', start_datetime=timezone.now(), location='Училище',
+            category='Училищно', description='Описание', attendees_text='Всички',
+        )
+        with self.assertNumQueries(0):
+            self.client.get('/api/posts/')
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        create_post(self.author, self.category)
+        self.client.force_authenticate(self.author)
+        self.client.get('/api/posts/')
+
+        with self.assertNumQueries(2):
+            self.client.get('/api/posts/')
+
+
+class ConditionalGetTests(TempMediaMixin, APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.author = User.objects.create(username='author')
+
+    def test_matching_etag_returns_not_modified_without_queries(self):
+        create_post(self.author, self.category)
+        etag = self.client.get('/api/posts/')['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_when_content_changes(self):
+        post = create_post(self.author, self.category)
+        etag = self.client.get(f'/api/posts/{post.pk}/')['ETag']
+
+        post.title = 'Ново заглавие'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        response = self.client.get(f'/api/posts/{post.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_site_status_etag(self):
+        SiteSettings.objects.create(pk=1)
+        etag = self.client.get('/api/site-status/')['ETag']
+        response = self.client.get('/api/site-status/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class SiteSettingsCacheTests(APITestMixin, TestCase):
+    def test_load_is_served_from_memory(self):
+        SiteSettings.objects.create(pk=1)
+        SiteSettings.load()
+
+        with self.assertNumQueries(0):
+            SiteSettings.load()
+
+    def test_change_in_another_process_is_picked_up(self):
+        SiteSettings.objects.create(pk=1)
+        self.assertFalse(SiteSettings.load().maintenance_mode)
+
+        # Друг процес записва настройките: локалното копие тук не се изчиства, но общата версия се сменя
+        SiteSettings.objects.filter(pk=1).update(maintenance_mode=True)
+        self.assertFalse(SiteSettings.load().maintenance_mode)
+        bump_model_version(SiteSettings)
+        self.assertTrue(SiteSettings.load().maintenance_mode)
+
+    def test_save_refreshes_the_flags(self):
+        settings_obj = SiteSettings.objects.create(pk=1)
+        self.assertTrue(SiteSettings.load().enable_user_registration)
+
+        settings_obj.enable_user_registration = False
+        settings_obj.save()
+        self.assertFalse(SiteSettings.load().enable_user_registration)
+
+        response = self.client.post('/api/auth/register/', {})
+        self.assertEqual(response.status_code, 403)
+
+
+class MaintenanceModeMiddlewareTests(APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username='admin', is_staff=True)
+        cls.user = User.objects.create(username='user')
+
+    def setUp(self):
+        super().setUp()
+        SiteSettings.objects.create(pk=1, maintenance_mode=True)
+
+    def test_api_returns_503_with_retry_after(self):
+        response = self.client.get('/api/events/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/events/').status_code, 503)
+
+    def test_site_status_stays_available(self):
+        response = self.client.get('/api/site-status/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['maintenance_mode'])
+
+    def test_staff_passes_through(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get('/api/events/').status_code, 200)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentVoteTests(APITestMixin, TransactionTestCase):
+    voters_count = 200
+
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create(username='author')
+        self.voters = User.objects.bulk_create(
+            [User(username=f'voter{i}') for i in range(self.voters_count)]
+        )
+        self.song = BellSongSuggestion.objects.create(
+            user=author, title='Песен', link='https://youtu.be/dQw4w9WgXcQ', status='approved'
+        )
+        self.meme = MemeOfWeek.objects.create(user=author, title='Меме', is_approved=True)
+
+    def _vote(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            return client.post(url).status_code
+        finally:
+            connection.close()
+
+    def _vote_in_parallel(self, users, url):
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            return list(executor.map(lambda user: self._vote(user, url), users))
+
+    def test_parallel_song_votes_are_all_counted(self):
+        codes = self._vote_in_parallel(self.voters, f'/api/songs/{self.song.pk}/vote/')
+
+        self.assertEqual(codes.count(200), self.voters_count)
+        self.song.refresh_from_db()
+        self.assertEqual(self.song.votes, self.voters_count)
+        self.assertEqual(self.song.voted_by.count(), self.voters_count)
+
+    def test_parallel_meme_votes_are_all_counted(self):
+        codes = self._vote_in_parallel(self.voters, f'/api/memes/{self.meme.pk}/vote/')
+
+        self.assertEqual(codes.count(200), self.voters_count)
+        self.meme.refresh_from_db()
+        self.assertEqual(self.meme.votes, self.voters_count)
+
+    def test_parallel_double_votes_count_once(self):
+        voter = self.voters[0]
+        codes = self._vote_in_parallel([voter] * 50, f'/api/memes/{self.meme.pk}/vote/')
+
+        self.assertEqual(codes.count(200), 1)
+        self.assertEqual(codes.count(400), 49)
+        self.meme.refresh_from_db()
+        self.assertEqual(self.meme.votes, 1)
+
+
+class HasVotedBatchingTests(APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create(username='viewer')
+        authors = [User.objects.create(username=f'author{i}') for i in range(3)]
+        cls.memes = [
+            MemeOfWeek.objects.create(user=authors[i % 3], title=f'Меме {i}', is_approved=True)
+            for i in range(20)
+        ]
+        cls.songs = [
+            BellSongSuggestion.objects.create(
+                user=authors[i % 3], title=f'Песен {i}', link='https://youtu.be/dQw4w9WgXcQ', status='approved'
+            )
+            for i in range(20)
+        ]
+        cls.memes[3].voted_by.add(cls.viewer)
+        cls.songs[5].voted_by.add(cls.viewer)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.viewer)
+        SiteSettings.load()
+
+    def test_memes_list_resolves_votes_in_one_query(self):
+        # Мемета (с автора) + гласовете на потребителя
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/memes/')
+        voted = [meme['id'] for meme in response.json() if meme['has_voted']]
+        self.assertEqual(voted, [self.memes[3].pk])
+
+    def test_approved_songs_list_resolves_votes_in_one_query(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/approved-songs/')
+        voted = [song['id'] for song in response.json() if song['has_voted']]
+        self.assertEqual(voted, [self.songs[5].pk])
+
+
+@override_settings(VOTE_BUFFERING=True)
+class BufferedVoteTests(APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.voter = User.objects.create(username='voter')
+        cls.meme = MemeOfWeek.objects.create(user=cls.voter, title='Меме', is_approved=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.voter)
+
+    def test_vote_is_recorded_and_counted_on_flush(self):
+        response = self.client.post(f'/api/memes/{self.meme.pk}/vote/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['has_voted'])
+        self.meme.refresh_from_db()
+        self.assertEqual(self.meme.votes, 0)
+        self.assertEqual(self.meme.voted_by.count(), 1)
+
+        call_command('flush_votes', stdout=io.StringIO())
+        self.meme.refresh_from_db()
+        self.assertEqual(self.meme.votes, 1)
+
+    def test_flush_recounts_only_newly_voted_items(self):
+        other = MemeOfWeek.objects.create(user=self.voter, title='Друго', is_approved=True)
+        call_command('flush_votes', stdout=io.StringIO())
+
+        # Броячът на другото меме е разминат, но за него няма нови гласове
+        MemeOfWeek.objects.filter(pk=other.pk).update(votes=7)
+        self.client.post(f'/api/memes/{self.meme.pk}/vote/')
+        self.assertEqual(PendingVote.objects.count(), 1)
+        with self.assertNumQueries(5):
+            # непренесени гласове + преброяване + UPDATE + изтриване на прочетените + празна следваща партида
+            self.assertEqual(votes.flush_votes(MemeOfWeek), 1)
+        other.refresh_from_db()
+        self.assertEqual(other.votes, 7)
+        self.assertFalse(PendingVote.objects.exists())
+
+        call_command('flush_votes', '--full', stdout=io.StringIO())
+        other.refresh_from_db()
+        self.assertEqual(other.votes, 0)
+
+    def test_double_vote_is_rejected(self):
+        self.client.post(f'/api/memes/{self.meme.pk}/vote/')
+        response = self.client.post(f'/api/memes/{self.meme.pk}/vote/')
+        self.assertEqual(response.status_code, 400)
+
+
+class PollStatisticsTests(APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.question = PollQuestion.objects.create(
+            title='Въпрос', start_date=timezone.now() - timedelta(days=1), end_date=timezone.now() + timedelta(days=1)
+        )
+        cls.correct = PollOption.objects.create(question=cls.question, key='a', text='Да', is_correct=True)
+        cls.wrong = PollOption.objects.create(question=cls.question, key='b', text='Не')
+        cls.users = [User.objects.create(username=f'user{i}') for i in range(3)]
+
+    def _submit(self, user, option):
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/poll/submit/', {'question': self.question.pk, 'selected_option': option.pk})
+        self.client.force_authenticate(None)
+        return response
+
+    def test_submit_updates_the_score(self):
+        self.assertEqual(self._submit(self.users[0], self.correct).status_code, 201)
+        self.assertEqual(self._submit(self.users[1], self.wrong).status_code, 201)
+
+        self.assertEqual(PollScore.objects.get(user=self.users[0]).correct_answers, 1)
+        self.assertEqual(PollScore.objects.get(user=self.users[1]).correct_answers, 0)
+
+        data = self.client.get('/api/poll/statistics/').json()
+        self.assertEqual([entry['username'] for entry in data['leaderboard']], ['user0'])
+        self.assertEqual({entry['id'] for entry in data['recent_participants']}, {self.users[0].pk, self.users[1].pk})
+
+    def test_statistics_is_a_constant_number_of_queries(self):
+        for user in self.users:
+            self._submit(user, self.correct)
+
+        SiteSettings.load()
+        with self.assertNumQueries(2):
+            self.client.get('/api/poll/statistics/')
+
+    def test_rebuild_matches_the_answers(self):
+        PollAnswer.objects.create(user=self.users[2], question=self.question, selected_option=self.correct)
+        self.assertFalse(PollScore.objects.exists())
+
+        call_command('rebuild_poll_scores', stdout=io.StringIO())
+        score = PollScore.objects.get(user=self.users[2])
+        self.assertEqual(score.correct_answers, 1)
+        self.assertIsNotNone(score.last_answered)
+
+
+class ActivePollSnapshotTests(APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.question = PollQuestion.objects.create(
+            title='Въпрос', start_date=timezone.now() - timedelta(days=1), end_date=timezone.now() + timedelta(days=1)
+        )
+        cls.correct = PollOption.objects.create(question=cls.question, key='a', text='Да', is_correct=True)
+        cls.wrong = PollOption.objects.create(question=cls.question, key='b', text='Не')
+        cls.user = User.objects.create(username='user')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_status_costs_one_query_once_the_snapshot_is_cached(self):
+        self.client.get('/api/poll/status/')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/poll/status/')
+        data = response.json()
+        self.assertFalse(data['is_locked'])
+        self.assertEqual([option['key'] for option in data['question']['options']], ['a', 'b'])
+
+    def test_locked_status_reports_the_correct_key(self):
+        PollAnswer.objects.create(user=self.user, question=self.question, selected_option=self.wrong)
+
+        data = self.client.get('/api/poll/status/').json()
+        self.assertTrue(data['is_locked'])
+        self.assertEqual(data['last_result'], {'questionId': self.question.pk, 'selected': 'b', 'correct': 'a'})
+
+    def test_editing_the_question_invalidates_the_snapshot(self):
+        self.client.get('/api/poll/status/')
+
+        self.question.title = 'Нов въпрос'
+        self.question.save()
+        self.assertEqual(self.client.get('/api/poll/status/').json()['question']['title'], 'Нов въпрос')
+
+        self.question.end_date = timezone.now() - timedelta(minutes=1)
+        self.question.save()
+        self.assertEqual(self.client.get('/api/poll/status/').status_code, 404)
+
+
+class PollSubmitTests(APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.question = PollQuestion.objects.create(
+            title='Въпрос', start_date=timezone.now() - timedelta(days=1), end_date=timezone.now() + timedelta(days=1)
+        )
+        cls.correct = PollOption.objects.create(question=cls.question, key='a', text='Да', is_correct=True)
+        cls.wrong = PollOption.objects.create(question=cls.question, key='b', text='Не')
+        cls.user = User.objects.create(username='user')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def _submit(self, option, **extra):
+        return self.client.post(
+            '/api/poll/submit/', {'question': self.question.pk, 'selected_option': option.pk}, **extra
+        )
+
+    def test_database_rejects_a_second_answer(self):
+        PollAnswer.objects.create(user=self.user, question=self.question, selected_option=self.correct)
+        with self.assertRaises(IntegrityError):
+            PollAnswer.objects.create(user=self.user, question=self.question, selected_option=self.wrong)
+
+    def test_second_submit_is_reported_as_already_answered(self):
+        self.assertEqual(self._submit(self.correct).status_code, 201)
+        self.assertEqual(self._submit(self.wrong).status_code, 403)
+        self.assertEqual(PollAnswer.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(PollScore.objects.get(user=self.user).correct_answers, 1)
+
+    def test_concurrent_first_score_is_added_to_not_reported_as_answered(self):
+        add_answer = PollScore._add_answer
+        calls = []
+
+        def add_answer_racing(answer, is_correct):
+            calls.append(answer)
+            if len(calls) == 1:
+                # Друга заявка създава реда между нашия неуспешен update и insert-а
+                PollScore.objects.create(user=self.user, correct_answers=1)
+                return 0
+            return add_answer(answer, is_correct)
+
+        with mock.patch.object(PollScore, '_add_answer', side_effect=add_answer_racing):
+            self.assertEqual(self._submit(self.correct).status_code, 201)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(PollAnswer.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(PollScore.objects.get(user=self.user).correct_answers, 2)
+
+    def test_retry_with_the_same_idempotency_key_replays_the_response(self):
+        first = self._submit(self.correct, HTTP_IDEMPOTENCY_KEY='abc')
+        retry = self._submit(self.correct, HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(PollAnswer.objects.filter(user=self.user).count(), 1)
+
+    def test_option_from_another_question_is_rejected(self):
+        other = PollQuestion.objects.create(title='Друг въпрос')
+        option = PollOption.objects.create(question=other, key='a', text='Да')
+        self.assertEqual(self._submit(option).status_code, 400)
+
+
+def full_table_scans(queryset):
+    """
+    Returns the tables MySQL reads in full (access_type ALL) for the given queryset.
+    """
+    tables = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get('access_type') == 'ALL':
+                tables.append(node.get('table_name'))
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(json.loads(queryset.explain(format='json')))
+    return tables
+
+
+@skipUnless(connection.vendor == 'mysql', 'Плановете на заявките се проверяват спрямо MySQL')
+class QueryPlanTests(TempMediaMixin, TestCase):
+    """
+    Runs EXPLAIN on the main query of each hot view against a seeded database
+    and fails if any of them reads a whole table.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'user{i}') for i in range(20)])
+        category = Category.objects.create(full_name='Новини', short_name='novini')
+        now = timezone.now()
+
+        Posts.objects.bulk_create([
+            Posts(
+                author=cls.users[i % 20], category=category, title=f'Публикация {i}', hook='Кукичка', content='Съдържание',
+                published=i % 3 != 0, allowed=i % 4 != 0, created_at=now - timedelta(hours=i),
+            )
+            for i in range(200)
+        ])
+        cls.post = Posts.objects.first()
+        Comments.objects.bulk_create([
+            Comments(post=cls.post, user=cls.users[i % 20], content=f'Коментар {i}') for i in range(200)
+        ])
+        MemeOfWeek.objects.bulk_create([
+            MemeOfWeek(user=cls.users[i % 20], title=f'Меме {i}', is_approved=i % 2 == 0, votes=i) for i in range(200)
+        ])
+        BellSongSuggestion.objects.bulk_create([
+            BellSongSuggestion(
+                user=cls.users[i % 20], title=f'Песен {i}', link='https://youtu.be/dQw4w9WgXcQ',
+                status=('pending', 'approved', 'rejected')[i % 3], votes=i,
+            )
+            for i in range(200)
+        ])
+        Event.objects.bulk_create([
+            Event(
+                title=f'Събитие {i}', start_datetime=now + timedelta(days=i), location='Училище',
+                category='Училищно', description='Описание', attendees_text='Всички', published=i % 2 == 0,
+            )
+            for i in range(200)
+        ])
+        Notification.objects.bulk_create([Notification(text=f'Известие {i}', enabled=i % 5 == 0) for i in range(200)])
+        # Реалистична история: много приключили анкети, една текуща и няколко планирани
+        PollQuestion.objects.bulk_create([
+            PollQuestion(title=f'Въпрос {i}', start_date=now + timedelta(weeks=i - 1), end_date=now + timedelta(weeks=i))
+            for i in range(-190, 10)
+        ])
+        cls.question = PollQuestion.objects.first()
+
+    def assertNoFullTableScan(self, queryset):
+        self.assertEqual(full_table_scans(queryset), [], queryset.query)
+
+    def test_posts_feed(self):
+        self.assertNoFullTableScan(
+            Posts.objects.filter(published=True, allowed=True).order_by('-created_at', '-id')[:10]
+        )
+
+    def test_comments_of_post(self):
+        self.assertNoFullTableScan(Comments.objects.filter(post=self.post).order_by('created_at'))
+
+    def test_comments_of_user(self):
+        self.assertNoFullTableScan(Comments.objects.filter(user=self.users[0]).order_by('-created_at')[:1])
+
+    def test_poll_answer_of_user(self):
+        self.assertNoFullTableScan(PollAnswer.objects.filter(user=self.users[0], question=self.question))
+
+    def test_active_poll_question(self):
+        now = timezone.now()
+        self.assertNoFullTableScan(PollQuestion.objects.filter(start_date__lte=now, end_date__gte=now))
+
+    def test_next_poll_question(self):
+        now = timezone.now()
+        self.assertNoFullTableScan(PollQuestion.objects.filter(end_date__gt=now, start_date__gt=now).order_by('start_date'))
+
+    def test_approved_memes(self):
+        self.assertNoFullTableScan(MemeOfWeek.objects.filter(is_approved=True).order_by('-votes', '-created_at'))
+
+    def test_approved_songs(self):
+        self.assertNoFullTableScan(
+            BellSongSuggestion.objects.filter(status='approved').order_by('-votes', '-submitted_at')
+        )
+
+    def test_published_events(self):
+        self.assertNoFullTableScan(Event.objects.filter(published=True).order_by('start_datetime'))
+
+    def test_enabled_notifications(self):
+        self.assertNoFullTableScan(Notification.objects.filter(enabled=True).order_by('-created_at'))
+
+
+class CommentThreadTests(TempMediaMixin, APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.users = [User.objects.create(username=f'user{i}') for i in range(3)]
+        cls.post = create_post(cls.users[0], category)
+        cls.threads = []
+        for i in range(30):
+            thread = Comments.objects.create(post=cls.post, user=cls.users[i % 3], content=f'Коментар {i}')
+            for j in range(5):
+                Comments.objects.create(post=cls.post, user=cls.users[j % 3], parent=thread, content=f'Отговор {j}')
+            cls.threads.append(thread)
+
+    def setUp(self):
+        super().setUp()
+        SiteSettings.load()
+
+    def test_threads_are_paginated_with_bounded_replies(self):
+        # Публикацията + коментарите от първо ниво (с брой отговори) + отговорите
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/posts/{self.post.pk}/comment-threads/', {'page_size': 10})
+        data = response.json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNotNone(data['next'])
+
+        first = data['results'][0]
+        self.assertEqual(first['id'], self.threads[0].pk)
+        self.assertEqual(first['reply_count'], 5)
+        self.assertEqual(len(first['replies']), 3)
+        self.assertEqual(first['replies'][0]['parent_username'], self.threads[0].user.username)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/posts/{self.post.pk}/comment-threads/', {'page_size': 30})
+        self.assertEqual(len(response.json()['results']), 30)
+
+    def test_flat_list_is_a_single_query(self):
+        # Публикацията + всички коментари
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/posts/{self.post.pk}/comments/')
+        self.assertEqual(len(response.json()), 180)
+
+    def test_remaining_replies(self):
+        response = self.client.get(f'/api/comments/{self.threads[0].pk}/replies/')
+        self.assertEqual(len(response.json()['results']), 5)
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+
+    def test_sliding_window(self):
+        limit = RateLimit('test', limit=2, period=60, clock=self.clock)
+        self.assertEqual(limit.hit('a'), 0)
+        self.clock.advance(10)
+        self.assertEqual(limit.hit('a'), 0)
+        self.assertEqual(limit.hit('a'), 50)
+        self.assertEqual(limit.hit('b'), 0)
+
+        self.clock.advance(50)
+        self.assertEqual(limit.hit('a'), 0)
+
+    def test_check_does_not_count(self):
+        limit = RateLimit('test', limit=1, period=60, clock=self.clock)
+        for _ in range(3):
+            self.assertEqual(limit.check('a'), 0)
+        limit.hit('a')
+        self.assertEqual(limit.check('a'), 60)
+
+    def test_rejected_and_released_events_are_not_counted(self):
+        limit = RateLimit('test', limit=2, period=60, clock=self.clock)
+        self.assertEqual(limit.hit('a'), 0)
+        limit.release('a', self.clock())
+        self.assertEqual(limit.hit('a'), 0)
+        self.assertEqual(limit.hit('a'), 0)
+        for _ in range(3):
+            self.assertEqual(limit.hit('a'), 60)
+        self.assertEqual(cache.get(limit.cache_key('a', limit.bucket(self.clock()))), 2)
+
+    def test_parallel_hits_do_not_exceed_the_limit(self):
+        limit = RateLimit('test', limit=5, period=60, clock=self.clock)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: limit.hit('a'), range(40)))
+        self.assertEqual(results.count(0), 5)
+
+    def test_throttle_keys_anonymous_requests_by_ip(self):
+        class Throttle(RateLimitThrottle):
+            rate_limit = RateLimit('test-throttle', limit=1, period=60, clock=self.clock)
+
+        def make_request(ip):
+            request = Request(APIRequestFactory().post('/', REMOTE_ADDR=ip))
+            request.user = AnonymousUser()
+            return request
+
+        self.assertTrue(Throttle().allow_request(make_request('10.0.0.1'), None))
+        throttle = Throttle()
+        self.assertFalse(throttle.allow_request(make_request('10.0.0.1'), None))
+        self.assertEqual(throttle.wait(), 60)
+        self.assertTrue(Throttle().allow_request(make_request('10.0.0.2'), None))
+
+
+class CommentRateLimitTests(TempMediaMixin, APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user')
+        cls.post = create_post(cls.user, Category.objects.create(full_name='Новини', short_name='novini'))
+
+    def setUp(self):
+        super().setUp()
+        SiteSettings.load()
+        self.client.force_authenticate(self.user)
+        self.clock = FakeClock()
+        for limit in (views.COMMENT_COOLDOWN, views.COMMENT_RATE_LIMIT):
+            patcher = mock.patch.object(limit, 'clock', self.clock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _comment(self):
+        return self.client.post(f'/api/posts/{self.post.pk}/comments/add/', {'content': 'Коментар'})
+
+    def test_cooldown_between_comments(self):
+        self.assertEqual(self._comment().status_code, 201)
+        self.clock.advance(45)
+
+        # Отхвърлен опит не докосва базата
+        with self.assertNumQueries(0):
+            response = self._comment()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('15 секунди', response.json()['detail'])
+
+        self.clock.advance(15)
+        self.assertEqual(self._comment().status_code, 201)
+
+    def test_five_comments_per_thirty_minutes(self):
+        for _ in range(5):
+            self.assertEqual(self._comment().status_code, 201)
+            self.clock.advance(60)
+        response = self._comment()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('5 коментара', response.json()['detail'])
+
+        self.clock.advance(30 * 60)
+        self.assertEqual(self._comment().status_code, 201)
+
+    def test_invalid_comment_is_not_counted(self):
+        self.assertEqual(self.client.post(f'/api/posts/{self.post.pk}/comments/add/', {}).status_code, 400)
+        self.assertEqual(self.client.post('/api/posts/999999/comments/add/', {'content': 'Коментар'}).status_code, 404)
+        self.assertEqual(self._comment().status_code, 201)
+
+
+class RenderedMarkdownTests(APITestMixin, TestCase):
+    def test_html_is_rendered_on_save(self):
+        notification = Notification.objects.create(text='**Внимание**\nнов ред')
+        self.assertEqual(notification.html_text, '<p><strong>Внимание</strong><br/>\nнов ред</p>')
+
+        notification.text = '_Обновено_'
+        notification.save(update_fields=['text'])
+        notification.refresh_from_db()
+        self.assertEqual(notification.html_text, '<p><em>Обновено</em></p>')
+
+    def test_html_is_sanitized(self):
+        changelog = Changelog.objects.create(
+            content='<script>alert(1)</script>[връзка](javascript:alert(1)) <img src="x.png" onerror="alert(1)">'
+        )
+        self.assertNotIn('script', changelog.content_html)
+        self.assertNotIn('javascript', changelog.content_html)
+        self.assertNotIn('onerror', changelog.content_html)
+        self.assertIn('src="x.png"', changelog.content_html)
+
+    def test_sanitizer_uses_an_allowlist(self):
+        html = sanitize_html(
+            '<svg><animate attributeName="href" values="javascript:alert(1)"/></svg>'
+            '<math><mi xlink:href="javascript:alert(1)">x</mi></math>'
+            '<a href="java&#x09;script:alert(1)" style="color:red" id="body">връзка</a>'
+            '<a href=" JAVASCRIPT:alert(1)">две</a>'
+            '<details open ontoggle="alert(1)"><summary>Заглавие</summary></details>'
+            '<a href="https://example.com/" title="Пример">пример</a><a href="/posts/1/">вътрешна</a>'
+            '<a href="mailto:info@example.com">поща</a><img src="data:image/png;base64,AA" alt="картинка">'
+        )
+        self.assertNotIn('javascript', html.lower())
+        for fragment in ('<svg', '<math', 'animate', 'style=', 'id=', 'ontoggle', '<details', 'data:'):
+            self.assertNotIn(fragment, html)
+        self.assertIn('Заглавие', html)
+        self.assertIn('<a href="https://example.com/" title="Пример">пример</a>', html)
+        self.assertIn('<a href="/posts/1/">вътрешна</a>', html)
+        self.assertIn('<a href="mailto:info@example.com">поща</a>', html)
+        self.assertIn('<img alt="картинка"/>', html)
+
+    def test_api_serves_the_stored_html(self):
+        Notification.objects.create(text='# Заглавие')
+        with mock.patch('blog.rendering.renderer.render') as render:
+            response = self.client.get('/api/notifications/')
+        render.assert_not_called()
+        self.assertEqual(response.json()[0]['html_text'], '<h1>Заглавие</h1>')
+
+    def test_backfill_command(self):
+        user = User.objects.create(username='author')
+        terms = TermsOfService.objects.create(user=user, content='*Условия*')
+        TermsOfService.objects.filter(pk=terms.pk).update(content_html='')
+
+        call_command('render_markdown', stdout=io.StringIO())
+        terms.refresh_from_db()
+        self.assertEqual(terms.content_html, '<p><em>Условия</em></p>')
+
+
+class MarkdownRendererTests(TestCase):
+    def test_repeated_text_is_served_from_the_cache(self):
+        renderer = MarkdownRenderer(maxsize=10)
+        first = renderer.render('**Здравей**')
+        with mock.patch.object(renderer, 'get_instance') as get_instance:
+            second = renderer.render('**Здравей**')
+        get_instance.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual(renderer.cache_info()['hits'], 1)
+        self.assertEqual(renderer.cache_info()['misses'], 1)
+
+    def test_extensions_are_part_of_the_key(self):
+        renderer = MarkdownRenderer(maxsize=10)
+        self.assertEqual(renderer.render('ред\nред'), '<p>ред\nред</p>')
+        self.assertEqual(renderer.render('ред\nред', ['nl2br']), '<p>ред<br/>\nред</p>')
+
+    def test_instance_is_reused_and_reset(self):
+        renderer = MarkdownRenderer(maxsize=10)
+        renderer.render('[a]: http://example.com\n\n[връзка][a]')
+        self.assertIs(renderer.get_instance(()), renderer.get_instance(()))
+        self.assertEqual(renderer.render('[връзка][a]'), '<p>[връзка][a]</p>')
+
+    def test_least_recently_used_entry_is_evicted(self):
+        renderer = MarkdownRenderer(maxsize=2)
+        renderer.render('едно')
+        renderer.render('две')
+        renderer.render('едно')
+        renderer.render('три')
+        renderer.render('едно')
+        renderer.render('две')
+        self.assertEqual(renderer.cache_info(), {'hits': 2, 'misses': 4, 'size': 2, 'maxsize': 2})
+
+
+class PostRenderingTests(APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.author = User.objects.create(username='author')
+
+    def test_outline_and_reading_time_are_stored_on_save(self):
+        content = '# Въведение\n\n' + 'дума ' * 450 + '\n\n## Детайли\n\ntext\n\n## Детайли'
+        post = create_post(self.author, self.category, content=content)
+
+        self.assertEqual(post.content_outline, [
+            {'level': 1, 'title': 'Въведение', 'id': 'въведение'},
+            {'level': 2, 'title': 'Детайли', 'id': 'детайли'},
+            {'level': 2, 'title': 'Детайли', 'id': 'детайли-2'},
+        ])
+        self.assertIn('<h2 id="детайли-2">Детайли</h2>', post.content_html)
+        self.assertEqual(post.word_count, 454)
+        self.assertEqual(post.reading_time, 3)
+
+        post.content = 'Кратко'
+        post.save(update_fields=['content'])
+        post.refresh_from_db()
+        self.assertEqual((post.content_outline, post.word_count, post.reading_time), ([], 1, 1))
+
+    def test_detail_returns_html_on_request(self):
+        post = create_post(self.author, self.category, content='## Раздел')
+
+        data = self.client.get(f'/api/posts/{post.pk}/').json()
+        self.assertEqual(data['content'], '## Раздел')
+        self.assertNotIn('content_html', data)
+        self.assertEqual(data['content_outline'], [{'level': 2, 'title': 'Раздел', 'id': 'раздел'}])
+
+        data = self.client.get(f'/api/posts/{post.pk}/', {'body': 'html'}).json()
+        self.assertEqual(data['content_html'], '<h2 id="раздел">Раздел</h2>')
+        self.assertNotIn('content', data)
+
+    def test_list_shows_reading_time(self):
+        create_post(self.author, self.category, content='дума ' * 250)
+        result = self.client.get('/api/posts/').json()['results'][0]
+        self.assertEqual(result['reading_time'], 2)
+        self.assertNotIn('content_outline', result)
+
+
+@override_settings(IMAGE_RENDITION_WIDTHS=(100, 400))
+class ImageRenditionTests(TempMediaMixin, APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.author = User.objects.create(username='author')
+
+    def test_renditions_are_generated_on_upload(self):
+        post = create_post(self.author, self.category, banner=image_file('banner.jpg', (800, 600), 'JPEG'))
+
+        renditions = post.banner_renditions
+        self.assertEqual(renditions['source'], post.banner.name)
+        self.assertEqual(renditions['width'], 800)
+        self.assertEqual(set(renditions['webp']), {'100', '400'})
+        with post.banner.storage.open(renditions['webp']['400']) as stored:
+            image = Image.open(stored)
+            self.assertEqual((image.format, image.size), ('WEBP', (400, 300)))
+        with post.banner.storage.open(renditions['jpeg']['100']) as stored:
+            self.assertEqual(Image.open(stored).format, 'JPEG')
+
+    def test_small_images_are_not_upscaled(self):
+        post = create_post(self.author, self.category)
+        image = PostImage.objects.create(post=post, image=image_file('small.png', (50, 20)))
+        self.assertEqual(set(image.image_renditions['webp']), {'50'})
+
+    def test_renditions_are_replaced_with_the_image(self):
+        post = create_post(self.author, self.category)
+        image = PostImage.objects.create(post=post, image=image_file('first.png', (200, 100)))
+        old_name = image.image_renditions['webp']['100']
+
+        image.image = image_file('second.png', (200, 100))
+        image.save()
+        self.assertEqual(image.image_renditions['source'], image.image.name)
+        self.assertFalse(image.image.storage.exists(old_name))
+
+    def test_renditions_are_deleted_with_the_row(self):
+        post = create_post(self.author, self.category)
+        image = PostImage.objects.create(post=post, image=image_file('gone.png', (200, 100)))
+        names = [name for extension in ('webp', 'jpeg') for name in image.image_renditions[extension].values()]
+        storage = image.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertTrue(names)
+        self.assertFalse(any(storage.exists(name) for name in names))
+
+    def test_serializers_expose_srcset(self):
+        post = create_post(self.author, self.category, banner=image_file('banner.png', (500, 100)))
+        PostImage.objects.create(post=post, image=image_file('gallery.png', (200, 100)))
+
+        data = self.client.get(f'/api/posts/{post.pk}/').json()
+        self.assertEqual(set(data['banner_srcset']), {'webp', 'jpeg'})
+        self.assertTrue(data['banner_srcset']['webp']['400'].endswith('/renditions/banner-400w.webp'))
+        self.assertEqual(set(data['images_srcset'][0]['jpeg']), {'100', '200'})
+
+        listed = self.client.get('/api/posts/').json()['results'][0]
+        self.assertEqual(listed['banner_srcset'], data['banner_srcset'])
+
+    def test_backfill_command(self):
+        user = User.objects.create(username='memer')
+        meme = MemeOfWeek.objects.create(user=user, title='Меме', image=image_file('meme.png', (300, 300)))
+        MemeOfWeek.objects.filter(pk=meme.pk).update(image_renditions={})
+
+        call_command('generate_renditions', stdout=io.StringIO())
+        meme.refresh_from_db()
+        self.assertEqual(set(meme.image_renditions['webp']), {'100', '300'})
+
+
+@override_settings(IMAGE_RENDITION_WIDTHS=(100,), MEDIA_MAX_IMAGE_SIZE=400)
+class MediaJobTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.author = User.objects.create(username='author', is_superuser=True, is_staff=True)
+
+    def setUp(self):
+        self.post = create_post(self.author, self.category)
+
+    def _photo(self, size):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: завъртяна на 90°
+        exif[0x010F] = 'Phone'
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue())
+
+    def _save_in_admin(self, files):
+        from .admin import PostsAdmin
+        from .forms import PostAdminForm
+        from django.contrib.admin.sites import site
+
+        request = APIRequestFactory().post('/admin/', files, format='multipart')
+        request.user = self.author
+        form = PostAdminForm(instance=self.post)
+        form.cleaned_data = {}
+        model_admin = PostsAdmin(Posts, site)
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.save_model(request, self.post, form, True)
+
+    def test_admin_upload_defers_processing(self):
+        self._save_in_admin({'gallery_images': [self._photo((1200, 600))], 'gallery_documents': [SimpleUploadedFile('plan.pdf', b'%PDF-1.4')]})
+
+        image = self.post.images.get()
+        self.assertEqual(image.image_renditions, {})
+        self.assertEqual(image.checksum, '')
+        self.assertEqual(
+            sorted(MediaJob.objects.values_list('task', 'status')),
+            [('process_post_document', 'pending'), ('process_post_image', 'pending')],
+        )
+
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(list(MediaJob.objects.exclude(status=MediaJob.STATUS_DONE).values_list("error", flat=True)), [])
+
+        image.refresh_from_db()
+        with image.image.open('rb'):
+            stored = Image.open(image.image)
+            self.assertEqual(stored.size, (200, 400))
+            self.assertFalse(stored.getexif())
+        self.assertEqual(len(image.checksum), 64)
+        self.assertEqual(set(image.image_renditions['webp']), {'100'})
+
+        document = self.post.documents.get()
+        self.assertEqual((document.size, document.content_type), (8, 'application/pdf'))
+        self.assertEqual(document.checksum, hashlib.sha256(b'%PDF-1.4').hexdigest())
+
+    def test_small_images_without_exif_are_kept(self):
+        image = PostImage.objects.create(post=self.post, image=image_file('small.png', (50, 50)))
+        name = image.image.name
+        jobs.enqueue('process_post_image', image.pk, post=self.post)
+        jobs.run_pending()
+
+        image.refresh_from_db()
+        self.assertEqual(image.image.name, name)
+        self.assertEqual(len(image.checksum), 64)
+
+    def test_failed_job_keeps_the_error(self):
+        with mock.patch.dict(jobs.TASKS, {'broken': mock.Mock(side_effect=ValueError('счупено'))}):
+            job = jobs.enqueue('broken', 1)
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (MediaJob.STATUS_FAILED, 1))
+        self.assertIn('ValueError: счупено', job.error)
+
+    @override_settings(MEDIA_JOB_TIMEOUT=60, MEDIA_JOB_MAX_ATTEMPTS=2)
+    def test_stale_running_jobs_are_reclaimed(self):
+        document = PostDocument.objects.create(post=self.post, file=SimpleUploadedFile('doc.pdf', b'pdf'))
+        started_at = timezone.now() - timedelta(minutes=5)
+        stale = MediaJob.objects.create(task='process_post_document', object_id=document.pk, status=MediaJob.STATUS_RUNNING, attempts=1, started_at=started_at)
+        exhausted = MediaJob.objects.create(task='process_post_document', object_id=document.pk, status=MediaJob.STATUS_RUNNING, attempts=2, started_at=started_at)
+        active = MediaJob.objects.create(task='process_post_document', object_id=document.pk, status=MediaJob.STATUS_RUNNING, attempts=1, started_at=timezone.now())
+
+        self.assertEqual(jobs.run_pending(), 1)
+        for job in (stale, exhausted, active):
+            job.refresh_from_db()
+        self.assertEqual((stale.status, stale.attempts), (MediaJob.STATUS_DONE, 2))
+        self.assertEqual(exhausted.status, MediaJob.STATUS_FAILED)
+        self.assertIn('60', exhausted.error)
+        self.assertEqual(active.status, MediaJob.STATUS_RUNNING)
+
+    @override_settings(MEDIA_JOBS_EAGER=True)
+    def test_eager_mode_runs_after_commit(self):
+        document = PostDocument.objects.create(post=self.post, file=SimpleUploadedFile('doc.zip', b'zip'))
+        with self.captureOnCommitCallbacks(execute=True):
+            job = jobs.enqueue('process_post_document', document.pk, post=self.post)
+        job.refresh_from_db()
+        document.refresh_from_db()
+        self.assertEqual(job.status, MediaJob.STATUS_DONE)
+        self.assertEqual(document.size, 3)
+
+
+CONTENT_ADDRESSED_STORAGES = {
+    'default': {'BACKEND': 'blog.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(IMAGE_RENDITION_WIDTHS=(100,))
+class ContentAddressedStorageTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.author = User.objects.create(username='author')
+
+    def setUp(self):
+        self.post = create_post(self.author, self.category)
+
+    @override_settings(STORAGES=CONTENT_ADDRESSED_STORAGES)
+    def test_identical_uploads_are_stored_once(self):
+        first = PostImage.objects.create(post=self.post, image=image_file('a.png', (300, 200)))
+        second = PostImage.objects.create(post=self.post, image=image_file('b.png', (300, 200)))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('cas/'))
+        self.assertEqual(StoredFile.objects.get(name=first.image.name).references, 2)
+
+        storage = first.image.storage
+        storage.delete(first.image.name)
+        self.assertTrue(storage.exists(second.image.name))
+        storage.delete(second.image.name)
+        self.assertFalse(storage.exists(second.image.name))
+        self.assertFalse(StoredFile.objects.filter(name=second.image.name).exists())
+
+    @override_settings(STORAGES=CONTENT_ADDRESSED_STORAGES)
+    def test_reuploading_the_same_content_keeps_one_reference(self):
+        image = PostImage.objects.create(post=self.post, image=image_file('a.png', (300, 200)))
+        document = PostDocument.objects.create(post=self.post, file=SimpleUploadedFile('plan.pdf', b'%PDF'))
+
+        image.image = image_file('again.png', (300, 200))
+        image.save()
+        document.file = SimpleUploadedFile('plan.pdf', b'%PDF')
+        document.save()
+        self.assertEqual(StoredFile.objects.get(name=image.image.name).references, 1)
+        self.assertEqual(StoredFile.objects.get(name=document.file.name).references, 1)
+
+    @override_settings(STORAGES=CONTENT_ADDRESSED_STORAGES)
+    def test_document_keeps_its_original_name(self):
+        PostDocument.objects.create(post=self.post, file=SimpleUploadedFile('Програма.pdf', b'%PDF'))
+        data = APIClient().get(f'/api/posts/{self.post.pk}/').json()
+        self.assertEqual(data['documents'][0]['file_name'], 'Програма.pdf')
+        self.assertTrue(PostDocument.objects.get().file.name.startswith('cas/'))
+
+    def test_dedupe_command_moves_existing_files(self):
+        user = User.objects.create(username='memer')
+        memes = [MemeOfWeek.objects.create(user=user, image=image_file(f'meme{i}.png', (150, 150))) for i in range(2)]
+        old_names = [meme.image.name for meme in memes]
+        self.assertNotEqual(*old_names)
+
+        with self.settings(STORAGES=CONTENT_ADDRESSED_STORAGES):
+            call_command('dedupe_media', stdout=io.StringIO())
+            for meme in memes:
+                meme.refresh_from_db()
+            storage = memes[0].image.storage
+            self.assertEqual(memes[0].image.name, memes[1].image.name)
+            self.assertEqual(memes[0].image_renditions['source'], memes[0].image.name)
+            self.assertEqual(StoredFile.objects.get(name=memes[0].image.name).references, 2)
+            self.assertEqual(StoredFile.objects.get(name=memes[0].image_renditions['webp']['100']).references, 2)
+            for name in old_names:
+                self.assertFalse(storage.exists(name))
+
+    @override_settings(STORAGES=CONTENT_ADDRESSED_STORAGES)
+    def test_dedupe_keeps_untracked_files_unless_asked(self):
+        from django.core.files.storage import default_storage
+
+        # Файл от качване, чийто запис още не е в базата
+        name = 'cas/00/00/uncommitted.png'
+        os.makedirs(os.path.dirname(default_storage.path(name)), exist_ok=True)
+        with open(default_storage.path(name), 'wb') as untracked:
+            untracked.write(b'png')
+        call_command('dedupe_media', stdout=io.StringIO())
+        self.assertTrue(default_storage.exists(name))
+
+        call_command('dedupe_media', '--purge-untracked', stdout=io.StringIO())
+        self.assertFalse(default_storage.exists(name))
+
+
+@override_settings(UPLOAD_CHUNK_SIZE=4)
+class ChunkedUploadTests(TempMediaMixin, APITestMixin, TestCase):
+    temp_dir_settings = ('MEDIA_ROOT', 'UPLOAD_SESSION_DIR')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.staff = User.objects.create(username='editor', is_staff=True, is_superuser=True)
+        cls.post = create_post(cls.staff, cls.category)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.staff)
+
+    def _start(self, content, **kwargs):
+        data = {
+            'post': self.post.pk,
+            'kind': 'document',
+            'file_name': 'Изпит.zip',
+            'size': len(content),
+            'checksum': hashlib.sha256(content).hexdigest(),
+        }
+        data.update(kwargs)
+        return self.client.post('/api/uploads/', data, format='json')
+
+    def _put(self, session_id, chunk, offset):
+        return self.client.generic(
+            'PUT', f'/api/uploads/{session_id}/', chunk,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_resumable_upload(self):
+        content = b'0123456789'
+        session_id = self._start(content).json()['id']
+
+        self.assertEqual(self._put(session_id, content[:4], 0).json()['offset'], 4)
+        # Повторено изпращане на вече получена част
+        response = self._put(session_id, content[:4], 0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').json()['offset'], 4)
+
+        self._put(session_id, content[4:8], 4)
+        self.assertEqual(self._put(session_id, content[8:], 8).json()['offset'], 10)
+
+        response = self.client.post(f'/api/uploads/{session_id}/complete/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['file_name'], 'Изпит.zip')
+        document = self.post.documents.get()
+        with document.file.open('rb'):
+            self.assertEqual(document.file.read(), content)
+        self.assertTrue(MediaJob.objects.filter(task='process_post_document', object_id=document.pk).exists())
+        self.assertFalse(os.path.exists(os.path.join(settings.UPLOAD_SESSION_DIR, f'{session_id}.part')))
+
+        self.assertEqual(self.client.post(f'/api/uploads/{session_id}/complete/').status_code, 400)
+        self.assertEqual(self.post.documents.count(), 1)
+
+    def test_oversized_chunk_is_rejected(self):
+        session_id = self._start(b'0123456789').json()['id']
+        self.assertEqual(self._put(session_id, b'01234', 0).status_code, 413)
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').json()['offset'], 0)
+
+    def test_checksum_mismatch_restarts_the_upload(self):
+        session_id = self._start(b'abcd', checksum='0' * 64).json()['id']
+        self._put(session_id, b'abcd', 0)
+        response = self.client.post(f'/api/uploads/{session_id}/complete/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('checksum', response.json())
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').json()['offset'], 0)
+        self.assertFalse(self.post.documents.exists())
+
+    def test_validation_and_permissions(self):
+        self.assertEqual(self._start(b'data', file_name='virus.exe').status_code, 400)
+        self.assertEqual(self._start(b'data', file_name='../../etc/Изпит.zip').json()['file_name'], 'Изпит.zip')
+        self.assertEqual(self._start(b'data', file_name='C:\\Users\\Изпит.zip').json()['file_name'], 'Изпит.zip')
+        self.assertEqual(self._start(b'data', file_name='dir/').status_code, 400)
+
+        other = User.objects.create(username='student')
+        self.client.force_authenticate(other)
+        self.assertEqual(self._start(b'data').status_code, 403)
+
+    def test_image_upload_is_queued_for_processing(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (20, 10), 'blue').save(buffer, 'PNG')
+        content = buffer.getvalue()
+        session_id = self._start(content, kind='image', file_name='photo.png').json()['id']
+        for offset in range(0, len(content), 4):
+            self._put(session_id, content[offset:offset + 4], offset)
+
+        response = self.client.post(f'/api/uploads/{session_id}/complete/')
+        self.assertEqual(response.status_code, 201)
+        image = self.post.images.get()
+        self.assertEqual(image.image_renditions, {})
+        jobs.run_pending()
+        image.refresh_from_db()
+        self.assertEqual(len(image.checksum), 64)
+
+    def test_decompression_bomb_is_rejected(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (20, 10), 'blue').save(buffer, 'PNG')
+        content = buffer.getvalue()
+        session_id = self._start(content, kind='image', file_name='bomb.png').json()['id']
+        for offset in range(0, len(content), 4):
+            self._put(session_id, content[offset:offset + 4], offset)
+
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 50):
+            response = self.client.post(f'/api/uploads/{session_id}/complete/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.post.images.exists())
+
+
+class MediaDownloadTests(TempMediaMixin, APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.author = User.objects.create(username='author')
+        cls.post = create_post(cls.author, cls.category)
+        cls.document = PostDocument.objects.create(post=cls.post, file=SimpleUploadedFile('План за уроците.pdf', b'0123456789'))
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/documents/{self.document.pk}/download/'
+
+    def _content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._content(response), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn("attachment; filename*=UTF-8''", response['Content-Disposition'])
+
+        data = self.client.get(f'/api/posts/{self.post.pk}/').json()
+        self.assertEqual(data['documents'][0]['file_url'], self.url)
+
+    def test_missing_file_is_not_found(self):
+        document = PostDocument.objects.create(post=self.post, file=SimpleUploadedFile('изтрит.pdf', b'pdf'))
+        document.file.storage.delete(document.file.name)
+        self.assertEqual(self.client.get(f'/api/documents/{document.pk}/download/').status_code, 404)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self._content(response), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(self._content(response), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_request(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_hidden_posts_are_only_served_to_staff(self):
+        Posts.objects.filter(pk=self.post.pk).update(allowed=False)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.force_authenticate(User.objects.create(username='editor', is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(MEDIA_OFFLOAD='nginx')
+    def test_nginx_offload(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-files/' + quote(self.document.file.name))
+
+    def test_post_images_link_to_download_view(self):
+        image = PostImage.objects.create(post=self.post, image=image_file('a.png'))
+        url = f'/api/post-images/{image.pk}/download/'
+
+        data = self.client.get(f'/api/posts/{self.post.pk}/').json()
+        self.assertEqual(data['images'], [url])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+
+    @override_settings(MEDIA_OFFLOAD='apache')
+    def test_apache_offload(self):
+        response = self.client.get(f'/api/post-images/{PostImage.objects.create(post=self.post, image=image_file("a.png")).pk}/download/')
+        self.assertTrue(response['X-Sendfile'].endswith('a.png'))
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+
+
+@override_settings(SEARCH_BACKEND='index')
+class SearchTests(APITestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(full_name='Новини', short_name='novini')
+        cls.author = User.objects.create(username='author')
+
+    def create_post(self, **kwargs):
+        # Индексът се обновява след приключване на транзакцията
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_post(self.author, self.category, **kwargs)
+
+    def reindex_callbacks(self, callbacks):
+        return [callback for callback in callbacks if getattr(callback, 'func', None) is signals.reindex_saved_post]
+
+    def test_tokenize_normalizes_and_stems(self):
+        self.assertEqual(search.tokenize('Училището и УЧИЛИЩА'), ['училищ', 'училищ'])
+        self.assertEqual(search.tokenize('Учителите, учителят'), ['учител', 'учител'])
+        self.assertEqual(search.tokenize('стре́ла и ѝ'), ['стрел'])
+
+    def test_results_are_ranked(self):
+        in_content = self.create_post(title='Спорт', content='Резултати от олимпиадата по математика')
+        in_title = self.create_post(title='Олимпиада по математика', content='Класиране')
+        self.create_post(title='Екскурзия', content='Пътуване до Рила')
+
+        results = self.client.get('/api/posts/search/', {'q': 'олимпиади'}).json()
+        self.assertEqual([post['id'] for post in results['results']], [in_title.pk, in_content.pk])
+        self.assertEqual(results['count'], 2)
+
+    def test_hidden_posts_are_not_found(self):
+        self.create_post(title='Тайна олимпиада', allowed=False)
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'олимпиада'}).json()['count'], 0)
+
+    def test_index_follows_edits(self):
+        post = self.create_post(title='Концерт')
+        post.title = 'Изложба'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'концерт'}).json()['count'], 0)
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'изложбата'}).json()['count'], 1)
+
+    def test_index_is_updated_after_commit(self):
+        post = self.create_post(title='Концерт')
+        post = Posts.objects.get(pk=post.pk)
+        post.content = 'Пролетен концерт на хора'
+        with self.captureOnCommitCallbacks() as callbacks:
+            post.save()
+            self.assertFalse(PostSearchTerm.objects.filter(post=post, term='хор').exists())
+        reindex = self.reindex_callbacks(callbacks)
+        self.assertEqual(len(reindex), 1)
+        reindex[0]()
+        self.assertTrue(PostSearchTerm.objects.filter(post=post, term='хор').exists())
+
+    def test_unchanged_text_is_not_reindexed(self):
+        post = Posts.objects.get(pk=self.create_post(title='Концерт').pk)
+        post.published = False
+        with self.captureOnCommitCallbacks() as callbacks:
+            post.save()
+            post.title = 'Изложба'
+            post.save(update_fields=['published'])
+        self.assertEqual(self.reindex_callbacks(callbacks), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'концерт'}).json()['count'], 0)
+
+        post.published = True
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save(update_fields=['published'])
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'концерт'}).json()['count'], 1)
+
+    def test_rolled_back_save_is_reindexed_later(self):
+        post = Posts.objects.get(pk=self.create_post(title='Концерт').pk)
+        post.title = 'Изложба'
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                post.save()
+                raise IntegrityError
+            post.save()
+        self.assertEqual(len(self.reindex_callbacks(callbacks)), 1)
+
+    def test_deleted_post_leaves_no_terms(self):
+        post = self.create_post(title='Концерт')
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertFalse(PostSearchTerm.objects.exists())
+
+    def test_rebuild_command(self):
+        first = self.create_post(title='Концерт')
+        self.create_post(title='Изложба')
+        self.create_post(title='Турнир')
+        PostSearchTerm.objects.all().delete()
+        PostSearchTerm.objects.create(post=first, term='остаряло', weight=1)
+
+        out = io.StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        self.assertIn('2/3', out.getvalue())
+        self.assertIn('3/3', out.getvalue())
+        self.assertFalse(PostSearchTerm.objects.filter(term='остаряло').exists())
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'изложба'}).json()['count'], 1)
+
+    def test_pagination_and_validation(self):
+        for i in range(3):
+            self.create_post(title=f'Турнир {i}')
+        data = self.client.get('/api/posts/search/', {'q': 'турнир', 'page_size': 2}).json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(self.client.get('/api/posts/search/').status_code, 400)
+
+    def test_admin_search_uses_the_index(self):
+        from django.contrib.admin.sites import site
+        from .admin import PostsAdmin
+
+        post = self.create_post(title='Благотворителен базар')
+        self.create_post(title='Друго')
+        queryset, _ = PostsAdmin(Posts, site).get_search_results(None, Posts.objects.all(), 'базара')
+        self.assertEqual(list(queryset), [post])
+
+
+@skipUnless(connection.vendor == 'mysql', 'FULLTEXT индексът съществува само в MySQL')
+@override_settings(SEARCH_BACKEND='mysql')
+class MySQLFullTextSearchTests(APITestMixin, TransactionTestCase):
+    """
+    InnoDB adds rows to the FULLTEXT index only on commit, so these tests run in real transactions.
+    """
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(full_name='Новини', short_name='novini')
+        self.author = User.objects.create(username='author')
+
+    def test_results_are_ranked(self):
+        in_content = create_post(self.author, self.category, title='Спорт', content='Резултати от олимпиадата по математика')
+        in_title = create_post(self.author, self.category, title='Олимпиада по математика', hook='Олимпиада', content='Класиране')
+        create_post(self.author, self.category, title='Екскурзия', content='Пътуване до Рила')
+
+        results = self.client.get('/api/posts/search/', {'q': 'олимпиади'}).json()
+        self.assertEqual([post['id'] for post in results['results']], [in_title.pk, in_content.pk])
+
+    def test_hidden_posts_are_not_found(self):
+        create_post(self.author, self.category, title='Тайна олимпиада', allowed=False)
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'олимпиада'}).json()['count'], 0)
+
+    def test_edits_are_found(self):
+        post = create_post(self.author, self.category, title='Концерт')
+        post.title = 'Изложба'
+        post.save()
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'изложбата'}).json()['count'], 1)
+
+    def test_no_terms_are_written(self):
+        create_post(self.author, self.category, title='Концерт')
+        self.assertFalse(PostSearchTerm.objects.exists())
@@ -0,0 +1,132 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from PIL.Image import DecompressionBombError
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .jobs import enqueue
+from .models import UploadSession, PostDocument, PostImage
+
+# Размер на парчетата, с които се чете и записва (паметта не зависи от размера на файла)
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class OffsetConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Отместването не съвпада с вече получените байтове."
+    default_code = 'offset_conflict'
+
+
+class ChunkTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Частта е по-голяма от позволеното."
+    default_code = 'chunk_too_large'
+
+
+def part_path(session):
+    return os.path.join(settings.UPLOAD_SESSION_DIR, f'{session.pk}.part')
+
+
+def append_chunk(session, stream, offset):
+    """
+    Writes the request body at `offset` of the part file and advances session.received.
+    The offset must equal the bytes received so far; a chunk interrupted midway is simply sent again from there.
+    """
+    if session.status != UploadSession.STATUS_OPEN:
+        raise ValidationError({'detail': "Качването вече е завършено."})
+    if offset != session.received:
+        raise OffsetConflict()
+
+    limit = min(settings.UPLOAD_CHUNK_SIZE, session.size - offset)
+    written = 0
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    path = part_path(session)
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as part:
+        part.seek(offset)
+        while True:
+            block = stream.read(READ_BLOCK_SIZE) if stream is not None else b''
+            if not block:
+                break
+            written += len(block)
+            if written > limit:
+                raise ChunkTooLarge()
+            part.write(block)
+
+    # Условното UPDATE отхвърля паралелна заявка със същото отместване
+    updated = UploadSession.objects.filter(pk=session.pk, received=offset, status=UploadSession.STATUS_OPEN).update(
+        received=offset + written, updated_at=timezone.now()
+    )
+    if not updated:
+        raise OffsetConflict()
+    session.received = offset + written
+    return session
+
+
+def part_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def discard(session):
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def complete_upload(session):
+    """
+    Verifies the size and checksum of the assembled file and attaches it to the post
+    as a PostDocument or PostImage; further processing is queued (see jobs.py).
+    Returns the created object.
+    """
+    if session.status != UploadSession.STATUS_OPEN:
+        raise ValidationError({'detail': "Качването вече е завършено."})
+    if session.received != session.size:
+        raise ValidationError({'detail': f"Получени са {session.received} от {session.size} байта."})
+
+    path = part_path(session)
+    with open(path, 'r+b') as part:
+        # Отрязваме остатъци от прекъснати опити след последния байт
+        part.truncate(session.size)
+    if part_checksum(path) != session.checksum:
+        UploadSession.objects.filter(pk=session.pk).update(received=0)
+        discard(session)
+        raise ValidationError({'checksum': "Контролната сума не съвпада. Качете файла отново."})
+
+    if session.kind == UploadSession.KIND_IMAGE:
+        try:
+            with Image.open(path) as image:
+                image.verify()
+        except (OSError, UnidentifiedImageError):
+            raise ValidationError({'detail': "Файлът не е валидно изображение."})
+        except DecompressionBombError:
+            raise ValidationError({'detail': "Изображението е с твърде голяма резолюция."})
+
+    with open(path, 'rb') as part, transaction.atomic():
+        # Повторно или паралелно завършване не създава втори запис
+        if not UploadSession.objects.filter(pk=session.pk, status=UploadSession.STATUS_OPEN).update(status=UploadSession.STATUS_COMPLETE):
+            raise ValidationError({'detail': "Качването вече е завършено."})
+        if session.kind == UploadSession.KIND_IMAGE:
+            obj = PostImage(post=session.post, image=File(part, name=session.file_name))
+            obj.defer_renditions = True
+            obj.save()
+            enqueue('process_post_image', obj.pk, post=session.post)
+        else:
+            obj = PostDocument(post=session.post, file=File(part, name=session.file_name))
+            obj.save()
+            enqueue('process_post_document', obj.pk, post=session.post)
+        session.status = UploadSession.STATUS_COMPLETE
+        session.object_id = obj.pk
+        session.save(update_fields=['object_id', 'updated_at'])
+    discard(session)
+    return obj
@@ -7,6 +7,7 @@ router = DefaultRouter()
 router.register('posts', blog_views.PostViewSet, basename='posts')
 router.register('poll', blog_views.WeeklyPollViewSet, basename='poll')
 router.register('memes', blog_views.MemeOfWeekViewSet, basename='memes')
+router.register('uploads', blog_views.UploadSessionViewSet, basename='uploads')
 
 # URL пътища
 urlpatterns = [
@@ -16,6 +17,12 @@ urlpatterns = [
     # Пътища за коментари
     path('posts/<int:post_pk>/comments/', blog_views.CommentList.as_view(), name='comment-list'),
     path('posts/<int:post_pk>/comments/add/', blog_views.AddCommentAPIView.as_view(), name='add-comment'),
+    path('posts/<int:post_pk>/comment-threads/', blog_views.CommentThreadList.as_view(), name='comment-thread-list'),
+    path('comments/<int:pk>/replies/', blog_views.CommentReplyList.as_view(), name='comment-reply-list'),
+
+    # Пътища за изтегляне на файлове към публикации
+    path('documents/<int:pk>/download/', blog_views.DocumentDownloadView.as_view(), name='document-download'),
+    path('post-images/<int:pk>/download/', blog_views.PostImageDownloadView.as_view(), name='post-image-download'),
 
     # Път за регистрация
     path('auth/register/', blog_views.RegisterView.as_view(), name='register'),
@@ -1,26 +1,43 @@
 from django.core.exceptions import ValidationError
 from django.contrib.auth import password_validation
-from rest_framework import viewsets, generics, status
+from rest_framework import viewsets, generics, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Count, Q, Max
+from django.utils.decorators import method_decorator
+from django.db import transaction, IntegrityError
+from django.db.models import Count, Prefetch
 from django.contrib.auth.models import User
-from .models import Posts, Comments, PollQuestion, PollAnswer, PollOption, ContactSubmission, Notification, Event, TermsOfService, BellSongSuggestion, PrivacyPolicy, MemeOfWeek, Cookie, SiteSettings, Changelog
-from .permissions import IsOwner
+from .models import Posts, Comments, PollQuestion, PollAnswer, PollOption, ContactSubmission, Notification, Event, TermsOfService, BellSongSuggestion, PrivacyPolicy, MemeOfWeek, Cookie, SiteSettings, Changelog, PostImage, PostDocument, Category, PollScore, UploadSession
+from .permissions import IsOwner, CanUploadPostFiles
+from .cache import cache_anonymous_response, etag_on_model_versions, idempotent_response
+from .pagination import PostCursorPagination, CommentCursorPagination, SearchPagination
+from .votes import add_vote
+from .polls import get_active_poll
+from .ratelimit import RateLimit
+from .uploads import append_chunk, complete_upload, discard
+from .downloads import media_response
+from .search import search_posts
 from .serializer import (
-    PostSerializer, RegisterSerializer, CommentSerializer,
+    PostSerializer, PostListSerializer, RegisterSerializer, CommentSerializer,
     PollQuestionSerializer, UserPollStatusSerializer, PollAnswerSerializer,
-    PollStatisticsSerializer, ContactSubmissionSerializer, NotificationSerializer,
+    CommentThreadSerializer, PollStatisticsSerializer, ContactSubmissionSerializer, NotificationSerializer,
     EventSerializer, TermsOfServiceSerializer, BellSongSuggestionSerializer,
     PrivacyPolicySerializer, MemeOfWeekSerializer, ConsentRecordSerializer, SiteSettingsSerializer,
-    ChangelogSerializer, PasswordChangeSerializer, UsernameChangeSerializer
+    ChangelogSerializer, PasswordChangeSerializer, UsernameChangeSerializer, UploadSessionSerializer,
+    PostDocumentSerializer
 )
 
+# Колко отговора се връщат заедно с всеки коментар от първо ниво
+COMMENT_REPLIES_PREVIEW = 3
+
+COMMENT_COOLDOWN = RateLimit('comment-cooldown', limit=1, period=60)
+COMMENT_RATE_LIMIT = RateLimit('comment', limit=5, period=30 * 60)
+
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
@@ -28,17 +45,106 @@ def get_client_ip(request):
     else:
         ip = request.META.get('REMOTE_ADDR')
     return ip
+class VotedIdsMixin:
+    """
+    Resolves which of the listed songs/memes the current user has voted for with one query
+    and passes the IDs to the serializer as context['voted_ids'].
+    """
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            context = kwargs.get('context') or self.get_serializer_context()
+            context['voted_ids'] = self.get_voted_ids(args[0])
+            kwargs['context'] = context
+        return super().get_serializer(*args, **kwargs)
+
+    def get_voted_ids(self, instances):
+        user = self.request.user
+        if not user.is_authenticated:
+            return set()
+        ids = [instance.pk for instance in instances]
+        model = self.get_queryset().model
+        return set(model.objects.filter(pk__in=ids, voted_by=user).values_list('pk', flat=True))
+@method_decorator(etag_on_model_versions(Posts, PostImage, PostDocument, Category), name='list')
+@method_decorator(etag_on_model_versions(Posts, PostImage, PostDocument, Category), name='retrieve')
+@method_decorator(cache_anonymous_response(Posts, PostImage, PostDocument, Category), name='list')
+@method_decorator(cache_anonymous_response(Posts, PostImage, PostDocument, Category), name='retrieve')
+@method_decorator(etag_on_model_versions(Posts, PostImage, Category), name='search')
+@method_decorator(cache_anonymous_response(Posts, PostImage, Category), name='search')
 class PostViewSet(viewsets.ModelViewSet):
-    queryset = Posts.objects.filter(published=True, allowed=True).order_by('-created_at')
+    queryset = Posts.objects.filter(published=True, allowed=True).order_by('-created_at', '-id')
     serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
     http_method_names = ['get', 'head', 'options']
-class MemeOfWeekViewSet(viewsets.ModelViewSet):
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('author', 'category').prefetch_related('images')
+        if self.action in ('list', 'search'):
+            # PostListSerializer не използва текста, а той е най-голямата част от реда
+            queryset = queryset.defer('content', 'content_html', 'content_outline')
+        else:
+            # Документите се връщат само в детайлния изглед
+            queryset = queryset.prefetch_related('documents')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'search'):
+            return PostListSerializer
+        return PostSerializer
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "Параметърът 'q' е задължителен."}, status=status.HTTP_400_BAD_REQUEST)
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(search_posts(self.get_queryset(), query), request, view=self)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads of post documents and gallery images:
+    POST /uploads/ opens a session, PUT /uploads/<id>/ with an Upload-Offset header appends the raw request body,
+    GET /uploads/<id>/ returns the offset to resume from and POST /uploads/<id>/complete/ attaches the verified file.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [CanUploadPostFiles]
+    http_method_names = ['get', 'post', 'put', 'delete', 'head', 'options']
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user).select_related('post')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard(instance)
+        instance.delete()
+
+    def update(self, request, *args, **kwargs):
+        session = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            return Response({"detail": "Липсва или е невалидна заглавката Upload-Offset."}, status=status.HTTP_400_BAD_REQUEST)
+        # Тялото се чете директно от потока на части, без да се буферира в паметта
+        append_chunk(session, request.stream, offset)
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = self.get_object()
+        obj = complete_upload(session)
+        if isinstance(obj, PostDocument):
+            data = PostDocumentSerializer(obj, context=self.get_serializer_context()).data
+        else:
+            data = {'id': obj.pk, 'image': obj.image.url}
+        return Response(data, status=status.HTTP_201_CREATED)
+class MemeOfWeekViewSet(VotedIdsMixin, viewsets.ModelViewSet):
     serializer_class = MemeOfWeekSerializer
     http_method_names = ['get', 'post', 'head', 'options']
 
     def get_queryset(self):
         if self.action == 'list':
-            return MemeOfWeek.objects.filter(is_approved=True).order_by('-votes', '-created_at')
+            return MemeOfWeek.objects.filter(is_approved=True).select_related('user').order_by('-votes', '-created_at')
         return MemeOfWeek.objects.all()
 
     def get_permissions(self):
@@ -49,7 +155,7 @@ class MemeOfWeekViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def perform_create(self, serializer):
-        site_settings, created = SiteSettings.objects.get_or_create(pk=1)
+        site_settings = SiteSettings.load()
         if not site_settings.enable_meme_of_the_week:
             raise PermissionDenied("Функцията 'Меме на седмицата' в момента е деактивирана.")
         serializer.save(user=self.request.user)
@@ -59,7 +165,7 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
 
     def post(self, request, *args, **kwargs):
-        site_settings, created = SiteSettings.objects.get_or_create(pk=1)
+        site_settings = SiteSettings.load()
         if not site_settings.enable_user_registration:
             return Response(
                 {"detail": "Регистрацията на потребители е временно деактивирана."},
@@ -130,19 +236,19 @@ class AccountDeactivateView(generics.UpdateAPIView):
         return Response({"status": "Профилът е деактивиран успешно"}, status=status.HTTP_200_OK)
 
 
-class MySongSuggestionsView(generics.ListAPIView):
+class MySongSuggestionsView(VotedIdsMixin, generics.ListAPIView):
     serializer_class = BellSongSuggestionSerializer
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return BellSongSuggestion.objects.filter(user=self.request.user)
+        return BellSongSuggestion.objects.filter(user=self.request.user).select_related('user')
 
-class MyMemesView(generics.ListAPIView):
+class MyMemesView(VotedIdsMixin, generics.ListAPIView):
     serializer_class = MemeOfWeekSerializer
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return MemeOfWeek.objects.filter(user=self.request.user)
+        return MemeOfWeek.objects.filter(user=self.request.user).select_related('user')
 
     def get_serializer_context(self):
         return {'request': self.request}
@@ -152,7 +258,7 @@ class MyCommentsView(generics.ListAPIView):
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return Comments.objects.filter(user=self.request.user)
+        return comment_queryset().filter(user=self.request.user)
 
 class MyCommentDeleteView(generics.DestroyAPIView):
     queryset = Comments.objects.all()
@@ -191,12 +297,13 @@ class BellSongSuggestionCreateAPIView(generics.CreateAPIView):
     serializer_class = BellSongSuggestionSerializer
     permission_classes = [IsAuthenticated]
     def perform_create(self, serializer):
-        site_settings, created = SiteSettings.objects.get_or_create(pk=1)
+        site_settings = SiteSettings.load()
         if not site_settings.enable_bell_suggestions:
             raise PermissionDenied("Функцията 'Предложения за звънец' в момента е деактивирана.")
         serializer.save(user=self.request.user, status='pending')
-class ApprovedBellSongListView(generics.ListAPIView):
-    queryset = BellSongSuggestion.objects.filter(status='approved').order_by('-votes', '-submitted_at')
+@method_decorator(cache_anonymous_response(BellSongSuggestion), name='get')
+class ApprovedBellSongListView(VotedIdsMixin, generics.ListAPIView):
+    queryset = BellSongSuggestion.objects.filter(status='approved').select_related('user').order_by('-votes', '-submitted_at')
     serializer_class = BellSongSuggestionSerializer
     permission_classes = [AllowAny]
 
@@ -209,17 +316,11 @@ class BellSongVoteView(APIView):
         if song.status != 'approved':
             return Response({'detail': 'Може да гласувате само за одобрени песни.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if user has already voted
-        if request.user in song.voted_by.all():
+        if not add_vote(song, request.user):
             return Response({'detail': 'Вече сте гласували за тази песен.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Add user to voters and increment vote count
-        song.voted_by.add(request.user)
-        song.votes += 1
-        song.save(update_fields=['votes'])
-
         # Pass context to serializer to access the request
-        serializer = BellSongSuggestionSerializer(song, context={'request': request})
+        serializer = BellSongSuggestionSerializer(song, context={'request': request, 'voted_ids': {song.pk}})
         return Response(serializer.data, status=status.HTTP_200_OK)
 class MemeVoteView(APIView):
     permission_classes = [IsAuthenticated]
@@ -228,19 +329,21 @@ class MemeVoteView(APIView):
         if not meme.is_approved:
             return Response({'detail': 'Може да гласувате само за одобрени мемета.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if user has already voted
-        if request.user in meme.voted_by.all():
+        if not add_vote(meme, request.user):
             return Response({'detail': 'Вече сте гласували за това меме.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Add user to voters and increment vote count
-        meme.voted_by.add(request.user)
-        meme.votes += 1
-        meme.save(update_fields=['votes'])
-
         # Pass context to serializer to access the request
-        serializer = MemeOfWeekSerializer(meme, context={'request': request})
+        serializer = MemeOfWeekSerializer(meme, context={'request': request, 'voted_ids': {meme.pk}})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+def comment_queryset():
+    """
+    Comments with everything CommentSerializer needs: the author and the parent's author joined,
+    and the number of replies annotated, so a list costs one query regardless of its size.
+    """
+    return Comments.objects.select_related('user', 'parent__user').annotate(reply_count=Count('replies'))
+
+
 class CommentList(generics.ListAPIView):
     serializer_class = CommentSerializer
     http_method_names = ['get', 'post', 'options', 'head']
@@ -251,40 +354,69 @@ class CommentList(generics.ListAPIView):
         post = get_object_or_404(Posts, id=post_id)
         # Fetch all comments for the post, ordered by creation date.
         # The frontend will be responsible for grouping replies.
-        return Comments.objects.filter(post=post).order_by('created_at')
+        return comment_queryset().filter(post=post).order_by('created_at')
+
+
+class CommentThreadList(generics.ListAPIView):
+    """
+    Top-level comments of a post, cursor-paginated, each with its first replies inline.
+    The rest of a thread is available from CommentReplyList.
+    """
+    serializer_class = CommentThreadSerializer
+    pagination_class = CommentCursorPagination
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        post = get_object_or_404(Posts, id=self.kwargs['post_pk'])
+        replies = Comments.objects.select_related('user').order_by('created_at', 'id')[:COMMENT_REPLIES_PREVIEW]
+        return comment_queryset().filter(post=post, parent__isnull=True).prefetch_related(
+            Prefetch('replies', queryset=replies, to_attr='reply_preview')
+        )
+
+
+class CommentReplyList(generics.ListAPIView):
+    serializer_class = CommentSerializer
+    pagination_class = CommentCursorPagination
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        parent = get_object_or_404(Comments, id=self.kwargs['pk'], parent__isnull=True)
+        return Comments.objects.filter(parent=parent).select_related('user', 'parent__user')
 class AddCommentAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, post_pk):
         user = request.user
-        now = timezone.now()
+
+        # Лимитите се заемат атомарно преди записа и се връщат, ако коментарът не бъде създаден
+        now = COMMENT_COOLDOWN.clock()
 
         # Cooldown: 60 seconds between comments
-        last_comment = Comments.objects.filter(user=user).order_by('-created_at').first()
-        if last_comment:
-            time_since_last_comment = now - last_comment.created_at
-            if time_since_last_comment < timedelta(seconds=60):
-                wait_time = 60 - int(time_since_last_comment.total_seconds())
-                return Response(
-                    {"detail": f"Трябва да изчакате още {wait_time} секунди, преди да коментирате отново."},
-                    status=status.HTTP_429_TOO_MANY_REQUESTS
-                )
+        wait_time = COMMENT_COOLDOWN.hit(user.pk, now)
+        if wait_time:
+            return Response(
+                {"detail": f"Трябва да изчакате още {wait_time} секунди, преди да коментирате отново."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
 
         # Rate Limit: 5 comments per 30 minutes
-        thirty_minutes_ago = now - timedelta(minutes=30)
-        comment_count = Comments.objects.filter(user=user, created_at__gte=thirty_minutes_ago).count()
-        if comment_count >= 5:
+        if COMMENT_RATE_LIMIT.hit(user.pk, now):
+            COMMENT_COOLDOWN.release(user.pk, now)
             return Response(
                 {"detail": "Надвишихте лимита от 5 коментара за 30 минути."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
             )
 
-        post = get_object_or_404(Posts, id=post_pk)
+        post = Posts.objects.filter(id=post_pk).first()
         serializer = CommentSerializer(data=request.data)
-        if serializer.is_valid():
-            comment = serializer.save(user=request.user, post=post)
-            return Response(CommentSerializer(comment).data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if post is None or not serializer.is_valid():
+            COMMENT_COOLDOWN.release(user.pk, now)
+            COMMENT_RATE_LIMIT.release(user.pk, now)
+            if post is None:
+                raise Http404
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        comment = serializer.save(user=request.user, post=post)
+        return Response(CommentSerializer(comment).data, status=status.HTTP_201_CREATED)
 class WeeklyPollViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
     def get_serializer_class(self):
@@ -296,96 +428,80 @@ class WeeklyPollViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'])
     def status(self, request):
-        site_settings, created = SiteSettings.objects.get_or_create(pk=1)
+        site_settings = SiteSettings.load()
         if not site_settings.enable_weekly_poll:
             return Response({"detail": "Функцията 'Анкети' в момента е деактивирана."}, status=status.HTTP_404_NOT_FOUND)
 
-        user = request.user
-        now = timezone.now()
+        poll = get_active_poll()
 
-        active_question = PollQuestion.objects.filter(start_date__lte=now, end_date__gte=now).first()
-
-        if not active_question:
+        if not poll:
             return Response({"detail": "В момента няма активни въпроси за анкети."}, status=status.HTTP_404_NOT_FOUND)
 
-        latest_answer = PollAnswer.objects.filter(user=user, question=active_question).first()
+        selected_option_id = PollAnswer.objects.filter(
+            user=request.user, question_id=poll.question.id
+        ).values_list('selected_option_id', flat=True).first()
 
-        if latest_answer:
-            correct_option = PollOption.objects.filter(question=active_question, is_correct=True).first()
-            data = {
-                'is_locked': True,
-                'unlocks_at': active_question.end_date,
-                'question': active_question,
-                'last_result': {
-                    'questionId': active_question.id,
-                    'selected': latest_answer.selected_option.key,
-                    'correct': correct_option.key if correct_option else None
-                }
-            }
-            return Response(UserPollStatusSerializer(data).data)
+        if selected_option_id:
+            return Response(UserPollStatusSerializer(self.locked_status(poll, poll.option_keys.get(selected_option_id))).data)
         else:
             data = {
                 'is_locked': False,
                 'unlocks_at': None,
-                'question': active_question,
+                'question': poll.question,
                 'last_result': None
             }
             return Response(UserPollStatusSerializer(data).data)
 
     @action(detail=False, methods=['post'])
+    @method_decorator(idempotent_response)
     def submit(self, request):
-        site_settings, created = SiteSettings.objects.get_or_create(pk=1)
+        site_settings = SiteSettings.load()
         if not site_settings.enable_weekly_poll:
             return Response({"detail": "Функцията 'Анкети' в момента е деактивирана."}, status=status.HTTP_403_FORBIDDEN)
 
-        user = request.user
-        now = timezone.now()
-
         serializer = PollAnswerSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        question = serializer.validated_data['question']
-        selected_option = serializer.validated_data['selected_option']
+        question_id = serializer.validated_data['question']
+        selected_option_id = serializer.validated_data['selected_option']
 
-        active_question = PollQuestion.objects.filter(
-            id=question.id,
-            start_date__lte=now,
-            end_date__gte=now
-        ).first()
+        poll = get_active_poll()
 
-        if not active_question:
+        if not poll or poll.question.id != question_id:
             return Response({"detail": "Тази анкета в момента не е активна."}, status=status.HTTP_403_FORBIDDEN)
 
-        if selected_option.question != active_question:
+        if selected_option_id not in poll.option_keys:
             return Response({"detail": "Избраната опция не принадлежи към този въпрос."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if PollAnswer.objects.filter(user=user, question=active_question).exists():
+        selected_key = poll.option_keys[selected_option_id]
+        # Уникалното ограничение (user, question) отхвърля повторен отговор, дори при едновременни заявки
+        try:
+            with transaction.atomic():
+                answer = PollAnswer.objects.create(user=request.user, question_id=question_id, selected_option_id=selected_option_id)
+                PollScore.record_answer(answer, is_correct=selected_key == poll.correct_key)
+        except IntegrityError:
             return Response({"detail": "Вече сте отговорили на тази анкета."}, status=status.HTTP_403_FORBIDDEN)
 
-        PollAnswer.objects.create(user=user, question=active_question, selected_option=selected_option)
+        return Response(UserPollStatusSerializer(self.locked_status(poll, selected_key)).data, status=status.HTTP_201_CREATED)
 
-        correct_option = PollOption.objects.filter(question=active_question, is_correct=True).first()
-        data = {
+    def locked_status(self, poll, selected_key):
+        return {
             'is_locked': True,
-            'unlocks_at': active_question.end_date,
-            'question': active_question,
+            'unlocks_at': poll.question.end_date,
+            'question': poll.question,
             'last_result': {
-                'questionId': active_question.id,
-                'selected': selected_option.key,
-                'correct': correct_option.key if correct_option else None
+                'questionId': poll.question.id,
+                'selected': selected_key,
+                'correct': poll.correct_key
             }
         }
-        return Response(UserPollStatusSerializer(data).data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def statistics(self, request):
-        leaderboard = User.objects.annotate(
-            correct_answers=Count('pollanswer', filter=Q(pollanswer__selected_option__is_correct=True))
-        ).filter(correct_answers__gt=0).order_by('-correct_answers')[:10]
-        recent_participants = User.objects.annotate(
-            last_answered=Max('pollanswer__created_at')
-        ).filter(last_answered__isnull=False).order_by('-last_answered')[:10]
+        scores = PollScore.objects.select_related('user')
+        leaderboard = scores.filter(correct_answers__gt=0).order_by('-correct_answers')[:10]
+        recent_participants = scores.filter(last_answered__isnull=False).order_by('-last_answered')[:10]
         serializer = PollStatisticsSerializer({
             'leaderboard': leaderboard,
             'recent_participants': recent_participants
@@ -399,21 +515,26 @@ class ContactFormSubmitView(APIView):
             serializer.save(user=request.user if request.user.is_authenticated else None)
             return Response({"detail": "Съобщението е изпратено успешно!"}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+@method_decorator(etag_on_model_versions(Notification), name='get')
+@method_decorator(cache_anonymous_response(Notification), name='get')
 class NotificationListView(generics.ListAPIView):
     queryset = Notification.objects.filter(enabled=True).order_by('-created_at')
     serializer_class = NotificationSerializer
     permission_classes = [AllowAny]
 
+@method_decorator(cache_anonymous_response(Event), name='get')
 class EventListView(generics.ListAPIView):
     queryset = Event.objects.filter(published=True).order_by('start_datetime')
     serializer_class = EventSerializer
     permission_classes = [AllowAny]
 
+@method_decorator(cache_anonymous_response(Changelog), name='get')
 class ChangelogListView(generics.ListAPIView):
     queryset = Changelog.objects.filter(is_active=True).order_by('-updated_at')
     serializer_class = ChangelogSerializer
     permission_classes = [AllowAny]
 
+@method_decorator(cache_anonymous_response(TermsOfService), name='get')
 class TermsOfServiceView(generics.GenericAPIView):
     serializer_class = TermsOfServiceSerializer
     permission_classes = [AllowAny]
@@ -422,6 +543,7 @@ class TermsOfServiceView(generics.GenericAPIView):
         if tos:
             return Response(self.get_serializer(tos).data)
         return Response({"detail": "Няма намерени Условия за ползване."}, status=status.HTTP_404_NOT_FOUND)
+@method_decorator(cache_anonymous_response(PrivacyPolicy), name='get')
 class PrivacyPolicyView(generics.GenericAPIView):
     serializer_class = PrivacyPolicySerializer
     permission_classes = [AllowAny]
@@ -439,12 +561,48 @@ class ConsentRecordCreateView(generics.CreateAPIView):
         user = self.request.user if self.request.user.is_authenticated else None
         ip_address = get_client_ip(self.request)
         serializer.save(user=user, ip_address=ip_address)
+class PostMediaDownloadView(APIView):
+    """
+    Serves a file attached to a post (see downloads.py).
+    Files of unpublished or not yet approved posts are available only to staff.
+    """
+    permission_classes = [AllowAny]
+    model = None
+    file_field = None
+    as_attachment = False
+
+    def get_object(self):
+        queryset = self.model.objects.select_related('post')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(post__published=True, post__allowed=True)
+        return get_object_or_404(queryset, pk=self.kwargs['pk'])
+
+    def get_file_name(self, obj):
+        return getattr(obj, self.file_field).name.split('/')[-1]
+
+    def get(self, request, *args, **kwargs):
+        obj = self.get_object()
+        field_file = getattr(obj, self.file_field)
+        if not field_file:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return media_response(request, field_file, self.get_file_name(obj), self.as_attachment, obj.checksum)
+class DocumentDownloadView(PostMediaDownloadView):
+    model = PostDocument
+    file_field = 'file'
+    as_attachment = True
+
+    def get_file_name(self, obj):
+        return obj.file_name or super().get_file_name(obj)
+class PostImageDownloadView(PostMediaDownloadView):
+    model = PostImage
+    file_field = 'image'
+@method_decorator(etag_on_model_versions(SiteSettings), name='get')
 class SiteStatusView(generics.RetrieveAPIView):
     permission_classes = [AllowAny]
     serializer_class = SiteSettingsSerializer
 
     def get_object(self):
-        obj, created = SiteSettings.objects.get_or_create(pk=1)
+        obj = SiteSettings.load()
         return obj
 class CheckUsernameView(APIView):
     permission_classes = [AllowAny]
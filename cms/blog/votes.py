@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import Count, F
+
+from .cache import bump_model_version
+from .models import PendingVote
+
+
+def add_vote(instance, user):
+    """
+    Records the user's vote for a song or meme.
+    The unique (item, user) pair of the voted_by through table rejects double votes, even concurrent ones.
+
+    By default the counter is incremented in the same transaction with F(), so parallel votes are never lost.
+    With VOTE_BUFFERING enabled only the vote row and a PendingVote row are inserted: the hot item row is not locked,
+    and `votes` is brought up to date later by flush_votes() (the flush_votes management command).
+    Returns False if the user has already voted.
+    """
+    voted_by = instance._meta.get_field('voted_by')
+    through = voted_by.remote_field.through
+    model = type(instance)
+    try:
+        with transaction.atomic():
+            through.objects.create(**{
+                f'{voted_by.m2m_field_name()}_id': instance.pk,
+                f'{voted_by.m2m_reverse_field_name()}_id': user.pk,
+            })
+            if settings.VOTE_BUFFERING:
+                PendingVote.objects.create(label=model._meta.label_lower, object_id=instance.pk)
+            else:
+                model.objects.filter(pk=instance.pk).update(votes=F('votes') + 1)
+    except IntegrityError:
+        return False
+
+    if not settings.VOTE_BUFFERING:
+        instance.refresh_from_db(fields=['votes'])
+        # update() не изпраща post_save, затова кешираните отговори се инвалидират ръчно
+        bump_model_version(model)
+    return True
+
+
+def recount_votes(queryset, batch_size=500):
+    """
+    Sets `votes` to the number of recorded voters for the items of the queryset whose counter is behind.
+    Returns the number of updated items.
+    """
+    stale = list(queryset.annotate(counted=Count('voted_by')).exclude(votes=F('counted')).only('pk', 'votes'))
+    for item in stale:
+        item.votes = item.counted
+    queryset.model.objects.bulk_update(stale, ['votes'], batch_size=batch_size)
+    return len(stale)
+
+
+def flush_votes(model, batch_size=500, full=False):
+    """
+    Brings `votes` up to date for the items with pending (buffered) votes, batch by batch.
+    Only the PendingVote rows that were read are deleted, so a vote committed during the flush waits for the next one.
+    With full=True every item is recounted instead. Recounting from the voted_by table makes the flush idempotent.
+    Returns the number of updated items.
+    """
+    if full:
+        updated = recount_votes(model.objects.all(), batch_size)
+    else:
+        updated = 0
+        pending = PendingVote.objects.filter(label=model._meta.label_lower).order_by('id')
+        while True:
+            batch = list(pending.values_list('id', 'object_id')[:batch_size])
+            if not batch:
+                break
+            updated += recount_votes(model.objects.filter(pk__in={object_id for _, object_id in batch}), batch_size)
+            PendingVote.objects.filter(id__in=[pk for pk, _ in batch]).delete()
+    if updated:
+        bump_model_version(model)
+    return updated
@@ -61,6 +61,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.middleware.MaintenanceModeMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -118,6 +119,35 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# LocMem е достатъчен за разработка и тестове. В продукция всички gunicorn worker-и
+# трябва да ползват общ backend (напр. 'django.core.cache.backends.redis.RedisCache'),
+# за да се инвалидира кешът навсякъде след промяна в съдържанието.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pgknma-blog',
+    }
+}
+
+# Колко секунди се пазят кешираните API отговори за анонимни потребители
+API_CACHE_TIMEOUT = 60 * 15
+
+# Колко секунди се помни отговорът за даден Idempotency-Key (повторени POST заявки)
+IDEMPOTENCY_KEY_TIMEOUT = 60 * 60 * 24
+
+# Брой рендерирани Markdown текстове, които всеки процес пази в паметта (LRU)
+MARKDOWN_CACHE_SIZE = 512
+
+# Стойност на Retry-After (в секунди) за 503 отговорите в режим на поддръжка
+MAINTENANCE_RETRY_AFTER = 60 * 5
+
+# Буферирано гласуване за мемета и песни: гласовете се записват без да се заключва редът на мемето,
+# а броячът 'votes' се обновява от `manage.py flush_votes` (напр. `--interval 10` или cron).
+VOTE_BUFFERING = False
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -178,6 +208,43 @@ CORS_ALLOW_CREDENTIALS = True
 MEDIA_URL = '/files/'
 MEDIA_ROOT = BASE_DIR / 'files'
 
+STORAGES = {
+    # 'blog.storage.ContentAddressedStorage' пази еднаквите файлове само веднъж (виж blog/storage.py).
+    # След превключване изпълнете manage.py dedupe_media за вече качените файлове.
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Ширини (в пиксели) на производните изображения, които се генерират при качване (виж blog/images.py)
+IMAGE_RENDITION_WIDTHS = (480, 960, 1600)
+
+# Качените в галерията снимки се смаляват до тази най-голяма страна (в пиксели) от фоновата обработка
+MEDIA_MAX_IMAGE_SIZE = 2560
+# Изпълнява фоновите задачи за файлове веднага след записа, без отделен процес (manage.py run_media_jobs)
+MEDIA_JOBS_EAGER = False
+# Задача, която се „обработва“ по-дълго от толкова секунди, се смята за прекъсната (спрян работник) и се връща в опашката,
+# докато опитите не достигнат MEDIA_JOB_MAX_ATTEMPTS
+MEDIA_JOB_TIMEOUT = 600
+MEDIA_JOB_MAX_ATTEMPTS = 3
+
+# Качване на части (виж blog/uploads.py): временните файлове са извън MEDIA_ROOT
+UPLOAD_SESSION_DIR = BASE_DIR / 'uploads_tmp'
+UPLOAD_CHUNK_SIZE = 1024 * 1024 * 5
+UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+UPLOAD_SESSION_TIMEOUT = 60 * 60 * 24
+
+# Изтеглянето на документи се предава на уеб сървъра: 'nginx' (X-Accel-Redirect), 'apache' (X-Sendfile) или None (FileResponse).
+# За nginx: location /protected-files/ { internal; alias <MEDIA_ROOT>/; }
+MEDIA_OFFLOAD = None
+MEDIA_ACCEL_PREFIX = '/protected-files/'
+
+# Търсене в публикациите (виж blog/search.py): 'mysql' (FULLTEXT индекс), 'index' (преносима таблица с думи) или 'auto'
+SEARCH_BACKEND = 'auto'
+
 UNFOLD = {
     "SITE_DROPDOWN": [
             {